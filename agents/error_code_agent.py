@@ -17,13 +17,12 @@ sys.path.append(parent_dir)
 try:
     from tools.error_code import error_code_tools
     from Model.state import State
+    from helper.llm import get_llm
 except ImportError as e:
     print(f"❌ Error importing error_code_tools: {e}")
     print("Make sure your file structure is correct and the tools module exists")
     sys.exit(1)
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
 from langchain_core.messages import  HumanMessage
 
 from typing_extensions import TypedDict
@@ -69,17 +68,8 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 #     remaining_steps: RemainingSteps
 
 try:
-    import google.generativeai as genai
-    
-    # Configure the Google AI client
-    genai.configure(api_key=GOOGLE_API_KEY)
-    
-    # Initialize using the method that worked in our test
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro",
-        temperature=0.1,
-    )
-    print("✅ Successfully initialized Google Generative AI")
+    # Shared, lazily created client for the tool_use role (see helper/llm.py)
+    llm = get_llm("tool_use")
     
 except Exception as e:
     print(f"❌ Error initializing Google Generative AI: {e}")
@@ -95,6 +85,10 @@ You are a specialized technical support agent with expertise in industrial machi
 You have access to the following tools to perform your task:
 - search_by_error_code: Use this tool to look up specific error codes (e.g., "E-352", "ERR-123"). This tool searches for exact or partial matches of error codes in the database.
 - search_by_machine: Use this tool to find all error codes associated with a specific machine (e.g., "MASTERFOLD", "NOVACUT"). This is useful when the user mentions a machine name but not a specific error code.
+- search_errors_by_symptom: Use this tool when the user describes a problem instead of giving a code (e.g., "conveyor running out of sync"). It returns the most similar errors with a similarity score, optionally for one machine. Call it once instead of guessing codes.
+- search_by_error_codes / search_by_machines: Batch versions taking a list of error codes or machines. When the user gives several codes or machines, make ONE batch call instead of one call per item; rows carry a "query" column and unmatched items are listed in "not_found".
+
+Every tool returns a table: "columns" lists the field names once and each entry of "rows" holds the values in that order; "total" is the number of matches. Use "fields" to request only the columns you need. When "next_cursor" is present, more rows exist: call the same tool with the same arguments and cursor set to it only if you need them. When "stale" is true, the sheet is unreachable and the rows are the last data loaded: answer from them, say the data may be out of date (see "stale_reason"), and do not call tools again hoping for fresher data.
 
 CORE LOGIC AND RESPONSIBILITIES:
 
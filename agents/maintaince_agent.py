@@ -15,13 +15,12 @@ sys.path.append(parent_dir)
 try:
     from tools.maintaince import maintenance_tools
     from Model.state import State
+    from helper.llm import get_llm
 except ImportError as e:
     print(f"❌ Error importing error_code_tools: {e}")
     print("Make sure your file structure is correct and the tools module exists")
     sys.exit(1)
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
 from langchain_core.messages import  HumanMessage
 
 from typing_extensions import TypedDict
@@ -67,17 +66,8 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 #     remaining_steps: RemainingSteps
 
 try:
-    import google.generativeai as genai
-    
-    # Configure the Google AI client
-    genai.configure(api_key=GOOGLE_API_KEY)
-    
-    # Initialize using the method that worked in our test
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro",
-        temperature=0.1,
-    )
-    print("✅ Successfully initialized Google Generative AI")
+    # Shared, lazily created client for the tool_use role (see helper/llm.py)
+    llm = get_llm("tool_use")
     
 except Exception as e:
     print(f"❌ Error initializing Google Generative AI: {e}")
@@ -92,12 +82,15 @@ You are a specialized maintenance scheduling and management agent with expertise
 
 You have access to the following tools to perform your task:
 - get_maintenance_by_machine: Get all scheduled maintenance tasks for a specific machine (e.g., "MASTERFOLD", "NOVACUT")
+- get_maintenance_by_machines: Batch version taking a list of machines. When the user asks about several machines, make ONE call instead of one per machine; rows carry a "query" column and machines without tasks are listed in "not_found".
 - get_maintenance_by_date_range: Find maintenance tasks scheduled within a specific date range (start_date, end_date in YYYY-MM-DD format)
 - get_overdue_maintenance: Find all maintenance tasks that are overdue (optional reference_date parameter)
 - get_upcoming_maintenance: Get maintenance tasks due within the next N days (default: 7 days)
 - search_maintenance_by_task: Search for maintenance tasks by keywords in task descriptions (e.g., "lubrication", "cleaning")
 - get_all_maintenance_sorted: Get all maintenance tasks sorted by due date (asc/desc order)
 
+Every tool returns a table: "columns" lists the field names once and each entry of "rows" holds the values in that order; "total" is the number of matches. Use "fields" to request only the columns you need. When "next_cursor" is present, more rows exist: call the same tool with the same arguments and cursor set to it only if you need them. When "stale" is true, the sheet is unreachable and the rows are the last data loaded: answer from them, say the data may be out of date (see "stale_reason"), and do not call tools again hoping for fresher data.
+
 CORE LOGIC AND RESPONSIBILITIES:
 
 1. **Query Analysis**: Carefully analyze the user's request to determine:
@@ -15,13 +15,12 @@ sys.path.append(parent_dir)
 try:
     from tools.part_code import part_code_tools
     from Model.state import State
+    from helper.llm import get_llm
 except ImportError as e:
     print(f"❌ Error importing part_code_tools: {e}")
     print("Make sure your file structure is correct and the tools module exists")
     sys.exit(1)
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
 from langchain_core.messages import  HumanMessage
 
 from typing_extensions import TypedDict
@@ -67,17 +66,8 @@ os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 #     remaining_steps: RemainingSteps
 
 try:
-    import google.generativeai as genai
-    
-    # Configure the Google AI client
-    genai.configure(api_key=GOOGLE_API_KEY)
-    
-    # Initialize using the method that worked in our test
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro",
-        temperature=0.1,
-    )
-    print("✅ Successfully initialized Google Generative AI")
+    # Shared, lazily created client for the tool_use role (see helper/llm.py)
+    llm = get_llm("tool_use")
     
 except Exception as e:
     print(f"❌ Error initializing Google Generative AI: {e}")
@@ -96,6 +86,10 @@ You have access to the following tools to perform your task:
 - search_parts_by_name: Search for parts by name or keywords in descriptions (e.g., "blade", "motor", "sensor")
 - search_parts_by_availability: Filter parts by availability status ("in_stock", "available", "out_of_stock")
 - search_parts_by_price_range: Find parts within a specific price range using min_price and max_price parameters
+- query_parts: Combine any of machine, keywords (text), availability_status, min_price and max_price in ONE call, with sort_by ("relevance", "price_asc", "price_desc") and limit
+- search_parts_by_codes / search_parts_by_machines: Batch versions taking a list of part codes or machines. When the user gives several codes or machines, make ONE batch call instead of one call per item; rows carry a "query" column and unmatched items are listed in "not_found".
+
+Every tool returns a table: "columns" lists the field names once and each entry of "rows" holds the values in that order; "total" is the number of matches. Use "fields" to request only the columns you need. When "next_cursor" is present, more rows exist: call the same tool with the same arguments and cursor set to it only if you need them. When "stale" is true, the sheet is unreachable and the rows are the last data loaded: answer from them, say the data may be out of date (see "stale_reason"), and do not call tools again hoping for fresher data.
 
 CORE LOGIC AND RESPONSIBILITIES:
 
@@ -112,7 +106,7 @@ CORE LOGIC AND RESPONSIBILITIES:
    - **Functional/Name Query**: Use search_parts_by_name for keywords like "cutting blade", "motor", "sensor"
    - **Budget Queries**: Use search_parts_by_price_range for price-sensitive searches
    - **Urgent Needs**: Use search_parts_by_availability to filter for "in_stock" items
-   - **Combination Searches**: Use multiple tools to refine results
+   - **Combination Searches**: Use query_parts with all the constraints at once instead of chaining several tools
 
 3. **Search Execution Strategy**:
    - Start with the most specific search tool based on user input
@@ -160,13 +154,13 @@ EXAMPLE INTERACTIONS:
 **Your Response**: Search by machine → Present: Organized list of all MASTERFOLD parts with codes, names, and availability
 
 **User Query**: "I need a cutting blade for my NOVACUT"
-**Your Response**: Search by name "blade" + filter by machine → Present: All blade options for NOVACUT with specifications
+**Your Response**: query_parts(text="blade", machine="NOVACUT") → Present: All blade options for NOVACUT with specifications
 
 **User Query**: "Show me parts under ₹10,000 that are in stock"
-**Your Response**: Search by price range (max ₹10,000) + filter by availability (in_stock) → Present: Budget-friendly available parts
+**Your Response**: query_parts(max_price=10000, availability_status="in_stock", sort_by="price_asc") → Present: Budget-friendly available parts
 
 **User Query**: "I need urgent replacement for motor on EXPERTFOLD"
-**Your Response**: Search by name "motor" + machine "EXPERTFOLD" + availability "in_stock" → Present: Available motors with immediate delivery
+**Your Response**: query_parts(text="motor", machine="EXPERTFOLD", availability_status="in_stock") → Present: Available motors with immediate delivery
 
 DATA STRUCTURE AWARENESS:
 The parts database contains these fields: machine, part_code, name, description, price, availability
@@ -5,6 +5,10 @@ import json
 import os
 from datetime import datetime
 
+from helper.data_source import FileDataSource, get_data_source, set_data_source
+from helper.llm_cache import cached_completion
+from helper.snapshot import get_snapshot
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -17,30 +21,10 @@ GOOGLE_SHEET_ID = "1AxAyCRjdMpD6nVGnBuGZsgeo1af0aLe611QhgFTvSPQ"
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel('gemini-1.5-flash')
 
-# Sample Data - Replace this with your actual data from Google Sheets
-SAMPLE_DATA = {
-    "error_codes": [
-        {"machine": "MASTERFOLD", "code": "E-352", "description": "Conveyor speed misalignment", "solution": "Check belt tension and sensor alignment"},
-        {"machine": "MASTERFOLD", "code": "E-401", "description": "Paper jam detected", "solution": "Clear paper path and check sensors"},
-        {"machine": "NOVACUT", "code": "ERR-123", "description": "Blade alignment error", "solution": "Calibrate cutting blade position"},
-        {"machine": "NOVACUT", "code": "ERR-456", "description": "Temperature sensor fault", "solution": "Replace temperature sensor unit"},
-        {"machine": "BOBST-SP102", "code": "SYS-001", "description": "System startup failure", "solution": "Power cycle and check connections"},
-    ],
-    "spare_parts": [
-        {"machine": "MASTERFOLD", "part_code": "MF-001", "name": "Folding Blade Assembly", "price": "$245.00", "availability": "In Stock"},
-        {"machine": "MASTERFOLD", "part_code": "MF-002", "name": "Conveyor Belt", "price": "$89.50", "availability": "In Stock"},
-        {"machine": "NOVACUT", "part_code": "NC-101", "name": "Cutting Blade", "price": "$156.00", "availability": "Out of Stock"},
-        {"machine": "NOVACUT", "part_code": "NC-102", "name": "Temperature Sensor", "price": "$67.25", "availability": "In Stock"},
-        {"machine": "BOBST-SP102", "part_code": "SP-201", "name": "Control Board", "price": "$425.00", "availability": "In Stock"},
-        {"machine": "MASTERFOLD", "part_code": "MF-003", "name": "Motor Assembly", "price": "$380.00", "availability": "Limited Stock"},
-    ],
-    "maintenance": [
-        {"machine": "MASTERFOLD", "next_due": "2024-08-15", "tasks": "Lubricate folding mechanisms, Check belt tension, Calibrate sensors"},
-        {"machine": "NOVACUT", "next_due": "2024-08-20", "tasks": "Replace cutting blade, Clean waste collection, Update firmware"},
-        {"machine": "BOBST-SP102", "next_due": "2024-08-10", "tasks": "System diagnostic, Replace filters, Check electrical connections"},
-        {"machine": "MASTERFOLD", "next_due": "2024-09-01", "tasks": "Monthly inspection, Replace worn parts, Performance testing"},
-    ]
-}
+# Data source - defaults to the bundled sample data, set DATA_SOURCE=sheets or file to serve real data
+SAMPLE_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "sample_data.json")
+if not os.getenv("DATA_SOURCE"):
+    set_data_source(FileDataSource(SAMPLE_DATA_PATH))
 
 def extract_intent_and_entities(user_message):
     """Use Gemini to determine user intent and extract entities"""
@@ -86,9 +70,9 @@ def extract_intent_and_entities(user_message):
         }
 
 def search_error_codes(machine, error_code):
-    """Search for error codes in the local data"""
+    """Search for error codes in the configured data source"""
     results = []
-    for row in SAMPLE_DATA["error_codes"]:
+    for row in get_snapshot().rows("error_codes"):
         match_machine = not machine or machine.upper() in row.get('machine', '').upper()
         match_code = not error_code or error_code.upper() in row.get('code', '').upper()
         
@@ -98,9 +82,9 @@ def search_error_codes(machine, error_code):
     return results
 
 def search_spare_parts(machine, part_name, keywords):
-    """Search for spare parts in the local data"""
+    """Search for spare parts in the configured data source"""
     results = []
-    for row in SAMPLE_DATA["spare_parts"]:
+    for row in get_snapshot().rows("spare_parts"):
         match_machine = not machine or machine.upper() in row.get('machine', '').upper()
         match_part = not part_name or part_name.upper() in row.get('name', '').upper() or part_name.upper() in row.get('part_code', '').upper()
         
@@ -117,9 +101,9 @@ def search_spare_parts(machine, part_name, keywords):
     return results
 
 def search_maintenance_info(machine):
-    """Search for maintenance information in the local data"""
+    """Search for maintenance information in the configured data source"""
     results = []
-    for row in SAMPLE_DATA["maintenance"]:
+    for row in get_snapshot().rows("maintenance"):
         match_machine = not machine or machine.upper() in row.get('machine', '').upper()
         if match_machine:
             results.append(row)
@@ -144,8 +128,7 @@ def generate_bot_response(user_message, intent_data, search_results):
         """
         
         try:
-            response = model.generate_content(no_data_prompt)
-            return response.text
+            return cached_completion("gemini-1.5-flash", no_data_prompt, lambda prompt: model.generate_content(prompt).text)
         except:
             return "I couldn't find specific information for your query. Please check the machine name and error code, or contact technical support for assistance."
     
@@ -176,8 +159,8 @@ def generate_bot_response(user_message, intent_data, search_results):
     """
     
     try:
-        response = model.generate_content(response_prompt)
-        return response.text
+        # Same question on the same data: answered from the response cache without calling Gemini
+        return cached_completion("gemini-1.5-flash", response_prompt, lambda prompt: model.generate_content(prompt).text)
     except Exception as e:
         print(f"Error generating response: {e}")
         return "I found some information but couldn't process it properly. Please try rephrasing your question."
@@ -258,15 +241,15 @@ def health():
 @app.route('/data')
 def show_data():
     """Show available data for debugging"""
-    return jsonify(SAMPLE_DATA)
+    return jsonify(get_snapshot().tabs)
 
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
     
     print("Starting Bobst AI Assistant (Simplified Version)...")
-    print("📊 Using local sample data (no Google Sheets required)")
-    print("🔧 To add your data, edit the SAMPLE_DATA dictionary in this file")
+    print(f"📊 Using data source: {get_data_source().name}")
+    print("🔧 To add your data, edit data/sample_data.json or set DATA_SOURCE=sheets / DATA_SOURCE=file")
     print("🌐 Server will start at: http://localhost:5000")
     print("📄 View available data at: http://localhost:5000/data")
     
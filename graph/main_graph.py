@@ -13,7 +13,9 @@ try:
     from agents.error_code_agent import error_code_subagent
     from agents.part_code_agent import part_code_subagent
     from agents.maintaince_agent import maintenance_subagent
+    from tools.error_code import get_error_overview
     from Model.state import State
+    from helper.llm import get_llm
 except ImportError as e:
     print(f"❌ Error importing required modules: {e}")
     print("Make sure your file structure is correct and all agent modules exist")
@@ -27,8 +29,6 @@ except ImportError as e:
     sys.exit(1)
 
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-import google.generativeai as genai
 from langchain_core.messages import  HumanMessage
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.store.memory import InMemoryStore
@@ -49,17 +49,8 @@ if not GOOGLE_API_KEY:
 os.environ["GOOGLE_API_KEY"] = GOOGLE_API_KEY
 
 try:
-    import google.generativeai as genai
-    
-    # Configure the Google AI client
-    genai.configure(api_key=GOOGLE_API_KEY)
-    
-    # Initialize using the method that worked in our test
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro",
-        temperature=0.1,
-    )
-    print("✅ Successfully initialized Google Generative AI")
+    # Shared, lazily created client for the routing role (see helper/llm.py)
+    llm = get_llm("routing")
     
 except Exception as e:
     print(f"❌ Error initializing Google Generative AI: {e}")
@@ -72,6 +63,9 @@ You are committed to delivering comprehensive technical assistance and ensuring
 You oversee a specialized team of technical subagents, each with distinct expertise areas to address various aspects of industrial machine support.
 Your primary responsibility is to serve as the strategic coordinator and decision-maker for this multi-agent technical support team.
 
+You also have one tool of your own:
+- **get_error_overview**: For an error code (optionally on one machine), returns in ONE call the error's diagnosis and solution, the machine's spare parts (those related to the error first) and its overdue and upcoming maintenance. Use it instead of deploying all three subagents when a question combines an error code with parts and/or maintenance. Each section is a table; when a section has "next_cursor" and you need its remaining rows, call again with the same arguments and that section's cursor argument as its note says (e.g. parts_cursor). When its result has "stale": true, the sheet is unreachable and the data is the last copy loaded: tell the customer it may be out of date and do not retry or re-deploy subagents for fresher data.
+
 Your technical support team consists of three specialized subagents that you can deploy to address customer requirements:
 
 1. **error_code_subagent**: This subagent specializes in machine error diagnosis and troubleshooting. It has comprehensive access to error code databases and can:
@@ -101,7 +95,7 @@ Carefully evaluate each customer inquiry to determine the appropriate technical
 - **Error/Troubleshooting Requests**: Deploy error_code_subagent
 - **Parts/Procurement Requests**: Deploy parts_inventory_subagent  
 - **Maintenance/Scheduling Requests**: Deploy maintenance_scheduler_subagent
-- **Multi-Domain Requests**: Deploy relevant subagents sequentially
+- **Multi-Domain Requests**: When the request names an error code, call the get_error_overview tool yourself; otherwise deploy relevant subagents sequentially
 
 **Subagent Deployment Strategy:**
 - For **single-domain queries**: Deploy the most appropriate specialist subagent
@@ -150,10 +144,7 @@ If a subagent cannot provide adequate resolution:
 **Expected Response Format**: "Your EXPERTFOLD equipment has the following overdue maintenance: 🚨 URGENT - Monthly lubrication service (Due: May 15, 2025 - 85 days overdue): Apply high-grade lubricant to all moving parts and joints. ⚠️ Belt tension inspection (Due: July 20, 2025 - 20 days overdue): Check and adjust all drive belt tensions. Please prioritize the lubrication service as extended delays may cause component damage."
 
 **Customer Query**: "MASTERFOLD has error E-410, also need maintenance schedule and replacement parts list"
-**Supervisor Decision**: Sequential deployment:
-1. error_code_subagent (error resolution)
-2. maintenance_scheduler_subagent (maintenance planning)  
-3. parts_inventory_subagent (parts identification)
+**Supervisor Decision**: Call get_error_overview with error_code='E-410' and machine='MASTERFOLD' (one call covers the error, its parts and the maintenance schedule)
 **Expected Response Format**: 
 "**Error Resolution**: Error E-410 on your MASTERFOLD indicates a feeder jam detected. Clear the paper path completely and restart the feeder system following proper safety procedures.
 
@@ -189,11 +180,9 @@ Customer Query: "Our EXPERTFOLD is down with an ERR-501 fault. What does that me
 
 Supervisor Action:
 
-Deploy error_code_subagent with parameter: error_code='ERR-501'.
-
-Deploy maintenance_scheduler_subagent with parameters: machine_name='EXPERTFOLD', status='overdue'.
+Call get_error_overview with parameters: error_code='ERR-501', machine='EXPERTFOLD'.
 
-Hypothetical Subagent Outputs:
+Hypothetical Tool Output (error and overdue_maintenance sections):
 
 { "error_code": "ERR-501", "machine": "EXPERTFOLD", "problem": "Primary motor overload.", "solution": "Check motor for obstructions. Verify motor amperage. If high, inspect bearings (part #B-451)." }
 
@@ -231,6 +220,7 @@ supervisor_prebuilt_workflow = create_supervisor(
     agents=[error_code_subagent, part_code_subagent, maintenance_subagent],  # List of subagents to supervise
     output_mode="last_message",  # Return only the final response (alternative: "full_history")
     model=llm,                   # Language model for supervisor reasoning and routing decisions
+    tools=[get_error_overview],  # Cross-sheet join answered without a subagent round-trip
     prompt=(supervisor_prompt),  # System instructions for the supervisor agent
     state_schema=State           # State schema defining data flow structure
 )
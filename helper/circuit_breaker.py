@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Consecutive failures (errors or calls over the latency budget) that open the circuit
+SHEETS_BREAKER_FAILURES = int(os.getenv("SHEETS_BREAKER_FAILURES", "3"))
+# Seconds the circuit stays open before one trial call is let through
+SHEETS_BREAKER_RESET = float(os.getenv("SHEETS_BREAKER_RESET", "30"))
+# Seconds a Sheets call may take before it counts as a failure
+SHEETS_LATENCY_BUDGET = float(os.getenv("SHEETS_LATENCY_BUDGET", "5"))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing backend for a while.
+
+    After failure_threshold consecutive failures the circuit opens and every
+    call fails fast with CircuitOpenError. Once reset_timeout has passed a
+    single trial call is allowed (half-open): success closes the circuit,
+    failure opens it again. A call that succeeds but takes longer than
+    latency_budget counts as a failure. is_failure decides which exceptions
+    count; the others (e.g. a 404) pass through without affecting the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=SHEETS_BREAKER_FAILURES, reset_timeout=SHEETS_BREAKER_RESET,
+                 latency_budget=SHEETS_LATENCY_BUDGET, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_budget = latency_budget
+        self.is_failure = is_failure or (lambda e: True)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.calls = 0
+        self.rejected = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.last_failure = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def _before_call(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is open after repeated failures")
+            if self._trial_running:
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit is half-open, trial call in progress")
+            self._state = self.HALF_OPEN
+            self._trial_running = True
+
+    def _record(self, failure: str = None):
+        with self._lock:
+            self._trial_running = False
+            if failure is None:
+                if self._state != self.CLOSED:
+                    print(f"✅ {self.name} circuit closed")
+                self._state = self.CLOSED
+                self._failures = 0
+                return
+            self.failures += 1
+            self._failures += 1
+            self.last_failure = failure
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"🚧 {self.name} circuit opened for {self.reset_timeout:g}s: {failure}")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def call(self, fn):
+        """Run fn() through the breaker. Raises CircuitOpenError without calling fn while open."""
+        self._before_call()
+        self.calls += 1
+        started = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            self._record(f"{type(e).__name__}: {e}" if self.is_failure(e) else None)
+            raise
+        elapsed = time.monotonic() - started
+        if elapsed > self.latency_budget:
+            self.slow_calls += 1
+            self._record(f"call took {elapsed:.1f}s (budget {self.latency_budget:g}s)")
+        else:
+            self._record()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "last_failure": self.last_failure,
+            "latency_budget_seconds": self.latency_budget,
+        }
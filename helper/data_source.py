@@ -0,0 +1,260 @@
+import csv
+import json
+import os
+import sys
+import threading
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+from googleapiclient.errors import HttpError
+
+from helper.circuit_breaker import CircuitOpenError
+from helper.google_sheets import (
+    GOOGLE_SHEET_ID, fetch_sheets_batch, sheets_breaker, sheets_cache, sheets_configured, stream_sheets_values
+)
+from helper.snapshot import (
+    EMPTY_SNAPSHOT, SNAPSHOT_COLUMNS, SNAPSHOT_RANGE, SNAPSHOT_TABS, Snapshot, build_snapshot, rows_to_values
+)
+
+load_dotenv()
+
+# "sheets" (Google Sheets API), "file" (local JSON/CSV snapshot) or "memory"
+DATA_SOURCE = os.getenv("DATA_SOURCE", "sheets").lower()
+DATA_SOURCE_PATH = os.getenv(
+    "DATA_SOURCE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "snapshot.json"),
+)
+
+
+def _normalize_rows(rows) -> list:
+    """Make file/in-memory rows look like Sheets rows: every value a string, missing values ''."""
+    return [
+        {str(key): '' if value is None else str(value) for key, value in row.items()}
+        for row in rows
+    ]
+
+
+class DataSource(ABC):
+    """Where the snapshot tabs come from. All tools and apps read through one of these."""
+
+    name = "base"
+
+    @abstractmethod
+    def load_tabs(self, tab_names=SNAPSHOT_TABS) -> dict:
+        """Return {tab_name: rows} for the requested tabs. Raises on errors."""
+
+    @abstractmethod
+    def get_snapshot(self) -> Snapshot:
+        """Return the current snapshot, loading it if needed. Never raises."""
+
+    @abstractmethod
+    def refresh(self) -> Snapshot:
+        """Force a reload and return the new snapshot."""
+
+    def start_background_refresh(self):
+        """Keep the snapshot loaded ahead of expiry so readers never wait. No-op for local sources."""
+
+
+class InMemoryDataSource(DataSource):
+    """Serves tabs held in memory, e.g. fixtures for offline load tests."""
+
+    name = "memory"
+
+    def __init__(self, tabs: dict):
+        self._snapshot = build_snapshot(rows_to_values({name: _normalize_rows(rows) for name, rows in tabs.items()}))
+
+    def load_tabs(self, tab_names=SNAPSHOT_TABS) -> dict:
+        return {name: self._snapshot.rows(name) for name in tab_names}
+
+    def get_snapshot(self) -> Snapshot:
+        return self._snapshot
+
+    def refresh(self) -> Snapshot:
+        return self._snapshot
+
+    def replace(self, tabs: dict) -> Snapshot:
+        """Swap in new tab data, diffed against the current snapshot."""
+        self._snapshot = build_snapshot(
+            rows_to_values({name: _normalize_rows(rows) for name, rows in tabs.items()}),
+            previous=self._snapshot,
+        )
+        return self._snapshot
+
+
+class FileDataSource(DataSource):
+    """
+    Serves tabs from a local snapshot: a JSON file of {"tab_name": [rows]} or a
+    directory holding one <tab_name>.csv per tab. The file is re-read only when
+    its modification time changes.
+    """
+
+    name = "file"
+
+    def __init__(self, path: str = DATA_SOURCE_PATH):
+        self.path = path
+        self._snapshot = None
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _modified_time(self):
+        if os.path.isdir(self.path):
+            return max((os.path.getmtime(os.path.join(self.path, f"{name}.csv"))
+                        for name in SNAPSHOT_TABS if os.path.exists(os.path.join(self.path, f"{name}.csv"))),
+                       default=None)
+        return os.path.getmtime(self.path) if os.path.exists(self.path) else None
+
+    def load_tabs(self, tab_names=SNAPSHOT_TABS) -> dict:
+        if os.path.isdir(self.path):
+            tabs = {}
+            for name in tab_names:
+                csv_path = os.path.join(self.path, f"{name}.csv")
+                if os.path.exists(csv_path):
+                    with open(csv_path, newline="", encoding="utf-8") as f:
+                        tabs[name] = _normalize_rows(csv.DictReader(f))
+            return tabs
+
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return {name: _normalize_rows(data.get(name, [])) for name in tab_names}
+
+    def _reload(self, mtime) -> Snapshot:
+        try:
+            snapshot = build_snapshot(rows_to_values(self.load_tabs()), previous=self._snapshot)
+            print(f"📂 Loaded snapshot {snapshot!r} from {self.path}")
+            self._snapshot, self._mtime = snapshot, mtime
+        except Exception as e:
+            print(f"❌ Error loading snapshot file {self.path}: {e}")
+        return self._snapshot or EMPTY_SNAPSHOT
+
+    def get_snapshot(self) -> Snapshot:
+        mtime = self._modified_time()
+        if self._snapshot is not None and mtime == self._mtime:
+            return self._snapshot
+        with self._lock:
+            if self._snapshot is not None and mtime == self._mtime:
+                return self._snapshot
+            return self._reload(mtime)
+
+    def refresh(self) -> Snapshot:
+        with self._lock:
+            return self._reload(self._modified_time())
+
+    @staticmethod
+    def save(snapshot: Snapshot, path: str):
+        """Write a snapshot as a JSON file, or as <tab>.csv files when path is a directory."""
+        if path.endswith(".json"):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot.tabs, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+            return
+
+        os.makedirs(path, exist_ok=True)
+        for name, rows in snapshot.tabs.items():
+            headers = list(dict.fromkeys(key for row in rows for key in row))
+            with open(os.path.join(path, f"{name}.csv"), "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=headers)
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+class SheetsDataSource(DataSource):
+    """
+    Serves tabs from Google Sheets, held in the sheet cache. Only SNAPSHOT_COLUMNS are
+    downloaded, large tabs are streamed in row chunks, and each reload is diffed against
+    the last snapshot, so only changed rows are parsed.
+    When Sheets fails or its circuit is open, the last snapshot is served marked stale.
+    """
+
+    name = "sheets"
+
+    def __init__(self):
+        self._last_snapshot = None
+
+    def load_tabs(self, tab_names=SNAPSHOT_TABS) -> dict:
+        return fetch_sheets_batch(tab_names, SNAPSHOT_RANGE)
+
+    def _load_snapshot(self) -> Snapshot:
+        values = stream_sheets_values(SNAPSHOT_TABS, SNAPSHOT_COLUMNS)
+        snapshot = build_snapshot(values, previous=self._last_snapshot)
+        self._last_snapshot = snapshot
+        print(f"📦 Loaded snapshot {snapshot!r}")
+        return snapshot
+
+    def get_snapshot(self) -> Snapshot:
+        if not sheets_configured():
+            return EMPTY_SNAPSHOT
+        try:
+            snapshot = sheets_cache.get_or_load((GOOGLE_SHEET_ID, SNAPSHOT_TABS, SNAPSHOT_RANGE), self._load_snapshot)
+            # While the circuit is not closed the cache keeps serving its last entry without raising
+            if sheets_breaker.state != sheets_breaker.CLOSED:
+                reason = f"{sheets_breaker.name} circuit is {sheets_breaker.state}: {sheets_breaker.last_failure}"
+                return snapshot.as_stale(reason)
+            return snapshot
+        except CircuitOpenError as e:
+            print(f"🚧 Not loading snapshot: {e}")
+            reason = str(e)
+        except HttpError as e:
+            print(f"❌ HTTP Error loading snapshot: {e}")
+            reason = f"HTTP {e.resp.status} from Google Sheets"
+        except Exception as e:
+            print(f"❌ Unexpected error loading snapshot: {e}")
+            reason = f"{type(e).__name__}: {e}"
+
+        if self._last_snapshot is None:
+            return EMPTY_SNAPSHOT
+        print(f"⚠️ Serving last-known-good snapshot {self._last_snapshot!r} (stale)")
+        return self._last_snapshot.as_stale(reason)
+
+    def refresh(self) -> Snapshot:
+        sheets_cache.invalidate(GOOGLE_SHEET_ID)
+        return self.get_snapshot()
+
+    def start_background_refresh(self):
+        if sheets_configured():
+            sheets_cache.start_refresher()
+
+
+_data_source = None
+_data_source_lock = threading.Lock()
+
+
+def create_data_source(kind: str = DATA_SOURCE, path: str = DATA_SOURCE_PATH) -> DataSource:
+    """Build a data source by name: 'sheets', 'file' or 'memory' (an empty in-memory source)."""
+    if kind == "sheets":
+        return SheetsDataSource()
+    if kind == "file":
+        return FileDataSource(path)
+    if kind == "memory":
+        return InMemoryDataSource({})
+    raise ValueError(f"Unknown DATA_SOURCE '{kind}', expected 'sheets', 'file' or 'memory'")
+
+
+def get_data_source() -> DataSource:
+    """Return the process-wide data source, created from DATA_SOURCE on first use."""
+    global _data_source
+    if _data_source is None:
+        with _data_source_lock:
+            if _data_source is None:
+                _data_source = create_data_source()
+    return _data_source
+
+
+def set_data_source(source: DataSource):
+    """Replace the process-wide data source (apps and load tests call this at startup)."""
+    global _data_source
+    with _data_source_lock:
+        _data_source = source
+
+
+def export_snapshot(path: str = DATA_SOURCE_PATH) -> Snapshot:
+    """Write the current snapshot to a local file so it can be served with DATA_SOURCE=file."""
+    snapshot = get_data_source().refresh()
+    FileDataSource.save(snapshot, path)
+    print(f"💾 Exported snapshot {snapshot!r} to {path}")
+    return snapshot
+
+
+if __name__ == "__main__":
+    # Export the configured source to a local snapshot: python -m helper.data_source [path]
+    export_snapshot(sys.argv[1] if len(sys.argv) > 1 else DATA_SOURCE_PATH)
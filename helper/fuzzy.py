@@ -0,0 +1,66 @@
+from itertools import combinations
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions),
+    or max_distance + 1 as soon as it is known to exceed max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(key: str, distance: int) -> set:
+    """Every string obtained by deleting up to `distance` characters from key."""
+    variants = {key}
+    for n in range(1, min(distance, len(key) - 1) + 1):
+        for positions in combinations(range(len(key)), n):
+            variants.add("".join(c for i, c in enumerate(key) if i not in positions))
+    return variants
+
+
+class FuzzyMatcher:
+    """
+    Symmetric-delete (SymSpell-style) typo lookup over a fixed set of keys.
+
+    Every key is stored under all its variants with up to max_distance
+    characters deleted. A query looks up its own delete variants, so the
+    candidates come from a few dict probes, and only those are checked with
+    edit_distance. Short queries allow a single edit, so "E35" does not match
+    half of the E-codes.
+    """
+
+    def __init__(self, keys, max_distance: int = 2):
+        self.max_distance = max_distance
+        self._variants = {}
+        for key in keys:
+            for variant in _deletes(key, max_distance):
+                self._variants.setdefault(variant, []).append(key)
+
+    def nearest(self, query: str) -> list:
+        """The keys closest to query within the allowed distance (all ties), or []."""
+        allowed = min(self.max_distance, 1 if len(query) <= 4 else 2)
+        best, matches, seen = allowed + 1, [], set()
+        for variant in _deletes(query, allowed):
+            for key in self._variants.get(variant, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                distance = edit_distance(query, key, allowed)
+                if distance < best:
+                    best, matches = distance, [key]
+                elif distance == best:
+                    matches.append(key)
+        return sorted(matches)
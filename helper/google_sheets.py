@@ -1,48 +1,306 @@
 from googleapiclient.errors import HttpError
-from googleapiclient.discovery import build
+import httplib2
+import json
 import os
 from dotenv import load_dotenv
 
+from helper.circuit_breaker import SHEETS_LATENCY_BUDGET, CircuitBreaker, CircuitOpenError
+from helper.sheet_cache import SheetCache
+from helper.sheets_client import SHEETS_HTTP_TIMEOUT, SheetsClientPool
+
 load_dotenv()
 
 GOOGLE_SHEETS_API_KEY = os.getenv("GOOGLE_SHEETS_API_KEY")
 GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 
+DRIVE_API_ENDPOINT = os.getenv("DRIVE_API_ENDPOINT", "https://www.googleapis.com/")
+DRIVE_FILES_URL = "{endpoint}drive/v3/files/{file_id}?fields=version&key={key}"
+
+# Rows requested per range when streaming large tabs
+SHEETS_CHUNK_ROWS = int(os.getenv("SHEETS_CHUNK_ROWS", "5000"))
+
+# A stalled socket gives up once the latency budget is spent
+sheets_pool = SheetsClientPool(GOOGLE_SHEETS_API_KEY, timeout=min(SHEETS_HTTP_TIMEOUT, SHEETS_LATENCY_BUDGET))
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for errors worth backing off from: rate limiting, server errors, timeouts and network failures."""
+    if isinstance(error, HttpError):
+        return error.resp.status == 429 or error.resp.status >= 500
+    return isinstance(error, (OSError, httplib2.HttpLib2Error))
+
+
+sheets_breaker = CircuitBreaker("Google Sheets", is_failure=is_transient_error)
+
 
-def query_google_sheets(sheet_name: str, range_name: str = "A:Z") -> list:
-    """Query data from a specific sheet in Google Sheets."""
+def get_spreadsheet_revision(spreadsheet_id: str):
+    """Return the Drive version number of the spreadsheet, or None if it cannot be read."""
+    url = DRIVE_FILES_URL.format(endpoint=DRIVE_API_ENDPOINT, file_id=spreadsheet_id, key=GOOGLE_SHEETS_API_KEY)
 
+    def request():
+        response, content = sheets_pool.get(url)
+        if response.status == 429 or response.status >= 500:
+            raise HttpError(response, content, uri=url)
+        return response, content
+
+    response, content = sheets_breaker.call(request)
+    if response.status != 200:
+        return None
+    return json.loads(content).get("version")
+
+
+sheets_cache = SheetCache(revision_fn=get_spreadsheet_revision)
+
+
+def sheets_configured() -> bool:
+    """Check that the Sheets API key and spreadsheet id are set."""
     if not GOOGLE_SHEETS_API_KEY:
         print("❌ Error: GOOGLE_SHEETS_API_KEY not found in environment variables")
-        return []
-    
+        return False
+
     if not GOOGLE_SHEET_ID:
         print("❌ Error: GOOGLE_SHEET_ID not found in environment variables")
+        return False
+    return True
+
+
+def _rows_to_dicts(sheet_name: str, values: list) -> list:
+    """Convert raw sheet values (header row first) into a list of row dicts."""
+    if not values:
+        print(f"⚠️ No data found in sheet: {sheet_name}")
+        return []
+
+    if len(values) < 2:
+        print(f"⚠️ Only headers found in sheet: {sheet_name}")
         return []
+
+    headers = values[0]
+    data = [dict(zip(headers, row + [''] * (len(headers) - len(row)))) for row in values[1:]]
+    print(f"✅ Successfully parsed {len(data)} rows from {sheet_name}")
+    return data
+
+
+def _fetch_sheet(sheet_name: str, range_name: str) -> list:
+    """Download a tab and convert it to a list of row dicts. Raises on API errors."""
+    sheet = sheets_pool.service().spreadsheets()
+    result = sheets_breaker.call(lambda: sheets_pool.execute(sheet.values().get(
+        spreadsheetId=GOOGLE_SHEET_ID,
+        range=f"{sheet_name}!{range_name}"
+    )))
+    return _rows_to_dicts(sheet_name, result.get('values', []))
+
+
+def _batch_get(ranges) -> list:
+    """Fetch several ranges with one batchGet and return their values in request order."""
+    sheet = sheets_pool.service().spreadsheets()
+    result = sheets_breaker.call(lambda: sheets_pool.execute(sheet.values().batchGet(
+        spreadsheetId=GOOGLE_SHEET_ID,
+        ranges=ranges
+    )))
+    return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+
+def fetch_sheets_batch_values(sheet_names, range_name: str = "A:Z") -> dict:
+    """Download the raw values of several tabs with a single values.batchGet request. Raises on API errors."""
+    return dict(zip(sheet_names, _batch_get([f"{name}!{range_name}" for name in sheet_names])))
+
+
+def fetch_sheets_batch(sheet_names, range_name: str = "A:Z") -> dict:
+    """Download several tabs with a single values.batchGet request. Raises on API errors."""
+    return {
+        name: _rows_to_dicts(name, values)
+        for name, values in fetch_sheets_batch_values(sheet_names, range_name).items()
+    }
+
+
+def _column_letter(index: int) -> str:
+    """0 -> A, 25 -> Z, 26 -> AA."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def fetch_sheet_headers(sheet_names) -> dict:
+    """Return {tab: header row} for several tabs, read with one batchGet and cached like the data."""
+    sheet_names = tuple(sheet_names)
+    return sheets_cache.get_or_load(
+        (GOOGLE_SHEET_ID, "__headers__", sheet_names),
+        lambda: {name: values[0] if values else [] for name, values in fetch_sheets_batch_values(sheet_names, "1:1").items()},
+    )
+
+
+def fetch_sheet_row_counts(sheet_names) -> dict:
+    """
+    Return {tab: number of rows in its grid} from one spreadsheets.get call. Not
+    cached: the grid grows as rows are appended. Raises on API errors.
+    """
+    sheet = sheets_pool.service().spreadsheets()
+    result = sheets_breaker.call(lambda: sheets_pool.execute(sheet.get(
+        spreadsheetId=GOOGLE_SHEET_ID,
+        fields="sheets.properties(title,gridProperties.rowCount)"
+    )))
+    counts = {
+        tab["properties"].get("title"): tab["properties"].get("gridProperties", {}).get("rowCount", 0)
+        for tab in result.get("sheets", [])
+    }
+    return {name: counts.get(name, 0) for name in sheet_names}
+
+
+def _column_runs(header: list, columns) -> tuple:
+    """
+    Resolve the wanted columns to their positions in the header. Returns the
+    projected header (in sheet order) and the runs of adjacent positions as
+    (first, last) pairs, so neighbouring columns are fetched as one range.
+    """
+    positions = sorted({i for i, name in enumerate(header) if columns is None or name in columns})
+    runs = []
+    for position in positions:
+        if runs and runs[-1][1] == position - 1:
+            runs[-1][1] = position
+        else:
+            runs.append([position, position])
+    return [header[i] for i in positions], runs
+
+
+def _chunk_ranges(sheet_name: str, runs, first_row: int, last_row: int) -> list:
+    return [f"{sheet_name}!{_column_letter(a)}{first_row}:{_column_letter(b)}{last_row}" for a, b in runs]
+
+
+def _join_runs(runs, run_values, height: int = 0) -> list:
+    """
+    Stitch the per-run values of one chunk back into rows of at least height rows,
+    padding the trailing empty cells and rows the API leaves out.
+    """
+    widths = [b - a + 1 for a, b in runs]
+    height = max([height] + [len(values) for values in run_values])
+    rows = []
+    for i in range(height):
+        row = []
+        for width, values in zip(widths, run_values):
+            cells = values[i] if i < len(values) else []
+            row.extend(cells)
+            row.extend([''] * (width - len(cells)))
+        rows.append(row)
+    return rows
+
+
+def _stream_tab(sheet_name, header, runs, rows, chunk_rows, row_count):
+    """
+    Yield the projected header, the rows of the first chunk, then later chunks as
+    they are fetched, up to the tab's grid row count. Blank rows are held back
+    until a non-blank row follows, so the tab's trailing blank rows are dropped
+    like in a plain fetch.
+    """
+    yield header
+    blank_rows = 0
+    next_row = chunk_rows + 2
+    while True:
+        for row in rows:
+            if not any(row):
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                yield [''] * len(header)
+            blank_rows = 0
+            yield row
+        if next_row > row_count:
+            return
+        last_row = min(next_row + chunk_rows - 1, row_count)
+        run_values = _batch_get(_chunk_ranges(sheet_name, runs, next_row, last_row))
+        rows = _join_runs(runs, run_values, last_row - next_row + 1)
+        next_row += chunk_rows
+
+
+def stream_sheets_values(sheet_names, columns_by_tab=None, chunk_rows: int = SHEETS_CHUNK_ROWS,
+                         _headers_checked=False) -> dict:
+    """
+    Stream the raw values of several tabs, downloading only the wanted columns.
+
+    Header positions are resolved once and cached, then only the columns in
+    columns_by_tab[tab] are requested (every column when the tab is not
+    listed). The first chunk of every tab, header row included, comes from one
+    batchGet; if that header no longer matches the cached one (columns were
+    moved) the headers are resolved again. A tab longer than the first chunk is
+    read on in chunks of chunk_rows rows, fetched only as its iterator is
+    consumed, so at most one chunk of raw response is held at a time. The API
+    leaves trailing empty rows out of every range, so a short chunk says
+    nothing about where the tab ends: chunks are read up to the grid row count
+    of the tab (fetch_sheet_row_counts).
+
+    Returns {tab: iterator} yielding the projected header row, then the rows,
+    ready for build_snapshot. Raises on API errors.
+    """
+    sheet_names = tuple(sheet_names)
+    columns_by_tab = columns_by_tab or {}
+    headers = fetch_sheet_headers(sheet_names)
+    row_counts = fetch_sheet_row_counts(sheet_names)
+    plans = {name: _column_runs(headers.get(name, []), columns_by_tab.get(name)) for name in sheet_names}
+
+    ranges, owners = [], []
+    for name, (_, runs) in plans.items():
+        for range_name in _chunk_ranges(name, runs, 1, chunk_rows + 1):
+            ranges.append(range_name)
+            owners.append(name)
+    run_values = {name: [] for name in plans}
+    for name, values in zip(owners, _batch_get(ranges) if ranges else []):
+        run_values[name].append(values)
+
+    streams = {}
+    for name, (header, runs) in plans.items():
+        rows = _join_runs(runs, run_values[name], min(chunk_rows + 1, row_counts[name]))
+        if runs and (not rows or rows[0] != header):
+            if _headers_checked:
+                raise ValueError(f"Header row of sheet {name} changed while it was being read")
+            print(f"🔄 Columns of sheet {name} moved, resolving headers again")
+            sheets_cache.discard((GOOGLE_SHEET_ID, "__headers__", sheet_names))
+            return stream_sheets_values(sheet_names, columns_by_tab, chunk_rows, _headers_checked=True)
+        streams[name] = _stream_tab(name, header, runs, rows[1:], chunk_rows, row_counts[name])
+    return streams
+
+
+def _fetch_sheet_columns(sheet_name: str, columns) -> list:
+    """Download only the given columns of a tab as row dicts. Raises on API errors."""
+    values = stream_sheets_values((sheet_name,), {sheet_name: columns})[sheet_name]
+    header = next(values)
+    data = [dict(zip(header, row)) for row in values]
+    print(f"✅ Successfully parsed {len(data)} rows ({', '.join(header)}) from {sheet_name}")
+    return data
+
+
+def query_google_sheets(sheet_name: str, range_name: str = "A:Z", columns=None) -> list:
+    """
+    Query data from a specific sheet in Google Sheets, served from the snapshot cache when fresh.
+    With columns, only those columns are downloaded (range_name is ignored) and the row dicts hold just them.
+    If Sheets fails or the circuit is open, the last rows fetched for the tab are returned instead.
+    """
+    if not sheets_configured():
+        return []
+    if columns:
+        columns = tuple(columns)
+        key = (GOOGLE_SHEET_ID, sheet_name, columns)
+        loader = lambda: _fetch_sheet_columns(sheet_name, columns)
+    else:
+        key = (GOOGLE_SHEET_ID, sheet_name, range_name)
+        loader = lambda: _fetch_sheet(sheet_name, range_name)
     try:
-        service = build('sheets', 'v4', developerKey=GOOGLE_SHEETS_API_KEY)
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=GOOGLE_SHEET_ID,
-            range=f"{sheet_name}!{range_name}"
-        ).execute()
-        
-        values = result.get('values', [])
-        if not values:
-            print(f"⚠️ No data found in sheet: {sheet_name}")
-            return []
-        
-        if len(values) < 2:
-            print(f"⚠️ Only headers found in sheet: {sheet_name}")
-            return []
-
-        headers = values[0]
-        data = [dict(zip(headers, row + [''] * (len(headers) - len(row)))) for row in values[1:]]
-        print(f"✅ Successfully parsed {len(data)} rows from {sheet_name}")
-        return data
+        return sheets_cache.get_or_load(key, loader)
+    except CircuitOpenError as e:
+        print(f"🚧 Not querying sheet {sheet_name}: {e}")
     except HttpError as e:
         print(f"❌ HTTP Error querying sheet {sheet_name}: {e}")
-        return []
     except Exception as e:
         print(f"❌ Unexpected error querying sheet {sheet_name}: {e}")
-        return []
\ No newline at end of file
+
+    last_good = sheets_cache.peek(key)
+    if last_good is not None:
+        print(f"⚠️ Serving last-known-good (stale) rows for sheet {sheet_name}")
+        return last_good
+    return []
+
+
+def get_cache_stats() -> dict:
+    """Return hit/miss counters of the sheet snapshot cache and the Sheets circuit breaker state."""
+    return {**sheets_cache.stats(), "circuit": sheets_breaker.stats()}
@@ -0,0 +1,600 @@
+import heapq
+import math
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+import numpy as np
+
+from helper.fuzzy import FuzzyMatcher
+from helper.records import machine_aliases, normalize_key, tokenize
+
+
+class CodeIndex:
+    """
+    Hash index from normalized codes to record positions.
+
+    An exact lookup is a single dict probe. The keys are also kept sorted, so
+    a prefix lookup is a bisect plus the matches, and only a lookup that
+    misses both falls back to scanning the distinct keys for a substring.
+    When even that finds nothing, the nearest codes within max_distance
+    edits are returned (a typo such as NC-0123 for NC-00123).
+    """
+
+    def __init__(self, records, key_attr: str, max_distance: int = 2):
+        self._positions = {}
+        for position, record in enumerate(records):
+            key = getattr(record, key_attr)
+            if key:
+                self._positions.setdefault(key, []).append(position)
+        self._keys = sorted(self._positions)
+        self.max_distance = max_distance
+        self._fuzzy = None
+
+    def exact(self, key: str) -> list:
+        return self._positions.get(key, [])
+
+    def prefix(self, key: str) -> list:
+        positions = []
+        for i in range(bisect_left(self._keys, key), len(self._keys)):
+            if not self._keys[i].startswith(key):
+                break
+            positions.extend(self._positions[self._keys[i]])
+        return sorted(positions)
+
+    def substring(self, key: str) -> list:
+        return sorted(p for k in self._keys if key in k for p in self._positions[k])
+
+    def nearest(self, key: str) -> list:
+        """Positions of the records whose code is closest to key within max_distance edits."""
+        if self._fuzzy is None:
+            # Built on the first miss only; most snapshots never need it
+            self._fuzzy = FuzzyMatcher(self._keys, self.max_distance)
+        keys = self._fuzzy.nearest(key)
+        if keys:
+            print(f"🔎 No code matches '{key}', using the nearest: {', '.join(keys)}")
+        return sorted(p for k in keys for p in self._positions[k])
+
+    def lookup(self, code: str) -> list:
+        """Positions of the records matching code: exact match, else prefix, else substring, else nearest."""
+        key = normalize_key(code)
+        if not key:
+            return []
+        return self.exact(key) or self.prefix(key) or self.substring(key) or self.nearest(key)
+
+
+class MachineIndex:
+    """
+    Inverted index from machine names to record positions, shared by every tab.
+
+    Each distinct machine is reachable through its aliases (BOBST-SP102 under
+    BOBSTSP102, BOBST and SP102), so a lookup is a dict probe and costs time
+    proportional to the rows it returns. A name that is no alias falls back to
+    a substring test over the distinct machines, never over the rows, and then
+    to the aliases within two edits (MASTRFOLD finds MASTERFOLD).
+    """
+
+    def __init__(self, records_by_tab: dict):
+        self._positions = {}     # machine key -> {tab: [positions]}
+        self._names = {}         # machine key -> machine name as written in the sheet
+        for tab, records in records_by_tab.items():
+            for position, record in enumerate(records):
+                if record.machine_key:
+                    self._positions.setdefault(record.machine_key, {}).setdefault(tab, []).append(position)
+                    self._names.setdefault(record.machine_key, record.machine)
+        self._aliases = {}       # alias -> [machine keys]
+        for key, name in self._names.items():
+            for alias in machine_aliases(name):
+                self._aliases.setdefault(alias, []).append(key)
+        self._fuzzy = FuzzyMatcher(self._aliases)
+
+    def machines(self) -> list:
+        """Distinct machine names, as written in the sheet."""
+        return sorted(self._names.values())
+
+    def resolve(self, machine: str) -> list:
+        """Keys of the machines a name refers to: by alias, else by substring, else by nearest alias."""
+        key = normalize_key(machine)
+        if not key:
+            return []
+        keys = self._aliases.get(key) or [name for name in self._positions if key in name]
+        if keys:
+            return keys
+        aliases = self._fuzzy.nearest(key)
+        if aliases:
+            print(f"🔎 No machine matches '{machine}', using the nearest: {', '.join(aliases)}")
+        return sorted({name for alias in aliases for name in self._aliases[alias]})
+
+    def lookup(self, machine: str, tab: str) -> list:
+        """Positions of the tab's records for the machine, in row order."""
+        keys = self.resolve(machine)
+        if len(keys) == 1:
+            return self._positions[keys[0]].get(tab, [])
+        return sorted(p for key in keys for p in self._positions[key].get(tab, ()))
+
+
+class DueDateIndex:
+    """
+    Maintenance due dates as a sorted array of ordinals plus the permutation
+    (record positions) that sorts them. Range, overdue and upcoming queries
+    are two bisects and a slice; sorted listings are the permutation itself.
+    Rows without a valid date are left out. Rows due the same day keep sheet order.
+    """
+
+    def __init__(self, records):
+        self._order = sorted((i for i, record in enumerate(records) if record.due is not None),
+                             key=lambda i: records[i].due)
+        self._dues = [records[i].due for i in self._order]
+        self._order_desc = sorted(self._order, key=lambda i: -records[i].due)
+
+    def between(self, start=None, end=None) -> list:
+        """Positions due within [start, end] (ordinals, either bound optional), earliest first."""
+        lo = bisect_left(self._dues, start) if start is not None else 0
+        hi = bisect_right(self._dues, end) if end is not None else len(self._dues)
+        return self._order[lo:hi]
+
+    def sorted_positions(self, descending: bool = False) -> list:
+        return self._order_desc if descending else self._order
+
+
+class PartColumns:
+    """
+    Spare parts as NumPy columns: price (float64, NaN when not a number),
+    availability (Availability codes) and machine (small int ids). Filters are
+    boolean masks combined in one vectorized pass, and yield record positions;
+    only the rows finally returned are turned back into dicts.
+    """
+
+    def __init__(self, records):
+        count = len(records)
+        self._machine_ids = {}
+        self.price = np.fromiter(
+            (np.nan if record.price is None else record.price for record in records), dtype=np.float64, count=count
+        )
+        self.availability = np.fromiter((record.availability for record in records), dtype=np.int8, count=count)
+        self.machine = np.fromiter(
+            (self._machine_ids.setdefault(record.machine_key, len(self._machine_ids)) for record in records),
+            dtype=np.int32, count=count,
+        )
+
+    def mask(self, machine_keys=None, availability=None, min_price=None, max_price=None, priced=False) -> np.ndarray:
+        """
+        Boolean mask of the parts matching every given filter. machine_keys are
+        normalized machine keys (see MachineIndex.resolve); priced keeps only
+        parts with a numeric price (implied by either price bound).
+        """
+        mask = np.ones(len(self.price), dtype=bool)
+        if machine_keys is not None:
+            ids = [self._machine_ids[key] for key in machine_keys if key in self._machine_ids]
+            mask &= np.isin(self.machine, ids)
+        if availability is not None:
+            mask &= self.availability == int(availability)
+        if priced:
+            mask &= ~np.isnan(self.price)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        return mask
+
+    def filter(self, **filters) -> np.ndarray:
+        """Positions (in sheet order) of the parts matching the filters of mask()."""
+        return np.flatnonzero(self.mask(**filters))
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Trigram inverted index for case-insensitive substring search over one text per row.
+
+    Postings are keyed by row id, so the index survives refreshes: a snapshot
+    with deltas gets a copy that shares every posting set the delta does not
+    touch. A search intersects the postings of the query's trigrams (smallest
+    first) to get candidate rows, then verifies the substring on those only.
+    """
+
+    def __init__(self, texts: dict):
+        self._texts = texts      # row_id -> upper-cased text
+        self._postings = {}      # trigram -> set of row ids
+        for row_id, text in texts.items():
+            for gram in trigrams(text):
+                self._postings.setdefault(gram, set()).add(row_id)
+
+    @classmethod
+    def from_rows(cls, row_ids, rows, text_fn) -> "TrigramIndex":
+        return cls({row_id: text_fn(row) for row_id, row in zip(row_ids, rows)})
+
+    def updated(self, delta, text_fn) -> "TrigramIndex":
+        """Return a new index with a TabDelta applied; this index is left untouched."""
+        if not delta:
+            return self
+        index = object.__new__(TrigramIndex)
+        index._texts = dict(self._texts)
+        index._postings = dict(self._postings)
+        copied = set()
+
+        def postings(gram):
+            if gram not in copied:
+                copied.add(gram)
+                index._postings[gram] = set(index._postings.get(gram, ()))
+            return index._postings[gram]
+
+        for row_id, _ in delta.removed:
+            for gram in trigrams(index._texts.pop(row_id, "")):
+                postings(gram).discard(row_id)
+        for row_id, _, _ in delta.updated:
+            for gram in trigrams(index._texts.pop(row_id, "")):
+                postings(gram).discard(row_id)
+        for row_id, row in [*delta.added, *((row_id, new) for row_id, _, new in delta.updated)]:
+            text = index._texts[row_id] = text_fn(row)
+            for gram in trigrams(text):
+                postings(gram).add(row_id)
+        return index
+
+    def search(self, term: str) -> list:
+        """Row ids whose text contains term (case-insensitive)."""
+        term = term.upper()
+        grams = trigrams(term)
+        if not grams:
+            # Shorter than a trigram: verify every row
+            return [row_id for row_id, text in self._texts.items() if term in text]
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self._postings.get(g, ()))):
+            found = self._postings.get(gram)
+            if not found:
+                return []
+            candidates = set(found) if candidates is None else candidates & found
+            if not candidates:
+                return []
+        return [row_id for row_id in candidates if term in self._texts[row_id]]
+
+
+class BM25Index:
+    """
+    Okapi BM25 ranking over one tokenized text per row.
+
+    Postings map each term to {row_id: term frequency}, so a query only scores
+    the rows containing one of its terms, and a heap keeps the best `limit`.
+    A query word that is not a term matches the terms starting with it
+    ("lubric" finds LUBRICATION). Like TrigramIndex, a snapshot with deltas
+    gets a copy that shares every posting the delta does not touch.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MAX_EXPANSIONS = 50
+
+    def __init__(self, texts: dict):
+        self._postings = {}      # term -> {row_id: term frequency}
+        self._lengths = {}       # row_id -> number of terms
+        self._total = 0
+        self._terms = None       # sorted vocabulary, built on the first prefix expansion
+        for row_id, text in texts.items():
+            self._add(row_id, text, lambda term: self._postings.setdefault(term, {}))
+
+    @classmethod
+    def from_rows(cls, row_ids, rows, text_fn) -> "BM25Index":
+        return cls({row_id: text_fn(row) for row_id, row in zip(row_ids, rows)})
+
+    def _add(self, row_id, text, postings):
+        counts = Counter(tokenize(text))
+        self._lengths[row_id] = sum(counts.values())
+        self._total += self._lengths[row_id]
+        for term, count in counts.items():
+            postings(term)[row_id] = count
+
+    def _remove(self, row_id, text, postings):
+        self._total -= self._lengths.pop(row_id, 0)
+        for term in set(tokenize(text)):
+            postings(term).pop(row_id, None)
+
+    def updated(self, delta, text_fn) -> "BM25Index":
+        """Return a new index with a TabDelta applied; this index is left untouched."""
+        if not delta:
+            return self
+        index = object.__new__(BM25Index)
+        index._postings = dict(self._postings)
+        index._lengths = dict(self._lengths)
+        index._total = self._total
+        index._terms = None
+        copied = set()
+
+        def postings(term):
+            if term not in copied:
+                copied.add(term)
+                index._postings[term] = dict(index._postings.get(term, ()))
+            return index._postings[term]
+
+        for row_id, old in delta.removed:
+            index._remove(row_id, text_fn(old), postings)
+        for row_id, old, new in delta.updated:
+            index._remove(row_id, text_fn(old), postings)
+            index._add(row_id, text_fn(new), postings)
+        for row_id, row in delta.added:
+            index._add(row_id, text_fn(row), postings)
+        for term in copied:
+            if not index._postings[term]:
+                del index._postings[term]
+        return index
+
+    def _expand(self, word: str) -> list:
+        if word in self._postings:
+            return [word]
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        terms = []
+        for i in range(bisect_left(self._terms, word), len(self._terms)):
+            if not self._terms[i].startswith(word) or len(terms) == self.MAX_EXPANSIONS:
+                break
+            terms.append(self._terms[i])
+        return terms
+
+    def scores(self, query: str) -> dict:
+        """BM25 score of every row containing a term of query, by row id."""
+        count = len(self._lengths)
+        if not count:
+            return {}
+        average = self._total / count or 1.0
+        scores = {}
+        for term in {term for word in set(tokenize(query)) for term in self._expand(word)}:
+            postings = self._postings[term]
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row_id, frequency in postings.items():
+                norm = self.K1 * (1 - self.B + self.B * self._lengths[row_id] / average)
+                scores[row_id] = scores.get(row_id, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+        return scores
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """The `limit` best (row_id, score) pairs for query, best first."""
+        if limit <= 0:
+            return []
+        return heapq.nlargest(limit, self.scores(query).items(), key=lambda item: item[1])
+
+
+# Words too common in symptom descriptions to tell errors apart
+_STOP_WORDS = frozenset(
+    "A AN AND ARE AS AT BE BY FOR FROM HAS IN IS IT ITS NOT OF ON OR THE THIS TO WAS WITH".split()
+)
+
+
+class SymptomIndex:
+    """
+    In-process semantic search over free text (error descriptions and solutions).
+
+    Each text is embedded with a hashing vectorizer: its words plus the
+    character 4-grams of each word (so "aligned" meets "misalignment") are
+    hashed into DIMENSIONS buckets, weighted by sublinear TF-IDF and
+    L2-normalized. Embeddings are kept as sparse rows (CSR arrays); a query is
+    embedded the same way, scored against every row in one vectorized pass
+    and the best are picked with argpartition.
+    """
+
+    DIMENSIONS = 1 << 18
+    MIN_SCORE = 0.05
+
+    def __init__(self, texts):
+        rows = [self._features(text) for text in texts]
+        lengths = np.fromiter((len(row) for row in rows), dtype=np.intp, count=len(rows))
+        self._size = len(rows)
+        # Row of every stored feature, so per-row sums are one bincount (empty rows sum to 0)
+        self._feature_rows = np.repeat(np.arange(self._size), lengths)
+        self._indices = np.fromiter((bucket for row in rows for bucket in row), dtype=np.int64,
+                                    count=len(self._feature_rows))
+        counts = np.fromiter((count for row in rows for count in row.values()), dtype=np.float32,
+                             count=len(self._feature_rows))
+        document_frequency = np.bincount(self._indices, minlength=self.DIMENSIONS)
+        self._idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        self._data = np.log1p(counts) * self._idf[self._indices]
+        norms = np.sqrt(self._row_sums(self._data ** 2))
+        norms[norms == 0] = 1
+        self._data /= np.repeat(norms, lengths)
+
+    @classmethod
+    def _features(cls, text) -> dict:
+        features = {}
+        for word in tokenize(text):
+            if word in _STOP_WORDS:
+                continue
+            bucket = zlib.crc32(word.encode()) % cls.DIMENSIONS
+            features[bucket] = features.get(bucket, 0) + 1
+            padded = f" {word} "
+            for i in range(len(padded) - 3):
+                bucket = zlib.crc32(padded[i:i + 4].encode()) % cls.DIMENSIONS
+                features[bucket] = features.get(bucket, 0) + 0.5
+        return features
+
+    def _row_sums(self, values) -> np.ndarray:
+        return np.bincount(self._feature_rows, weights=values, minlength=self._size)
+
+    def search(self, query: str, limit: int = 5, positions=None) -> list:
+        """The `limit` best (position, cosine similarity) pairs for query, best first, optionally among positions."""
+        features = self._features(query)
+        if not features or limit <= 0 or not self._size:
+            return []
+        vector = {bucket: math.log1p(count) * self._idf[bucket] for bucket, count in features.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        query_weights = np.zeros(self.DIMENSIONS, dtype=np.float32)
+        query_weights[list(vector)] = [weight / norm for weight in vector.values()]
+        scores = self._row_sums(self._data * query_weights[self._indices])
+        candidates = np.arange(len(scores)) if positions is None else np.asarray(positions, dtype=np.intp)
+        scores = scores[candidates]
+        top = np.argpartition(-scores, limit - 1)[:limit] if len(scores) > limit else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top if scores[i] >= self.MIN_SCORE]
+
+
+def error_text(row: dict) -> str:
+    return f"{row.get('description', '')} {row.get('solution', '')}"
+
+
+class ErrorJoinIndex:
+    """
+    Error codes joined to their machine's spare parts and maintenance tasks.
+
+    The join on the machine key is done once per snapshot: every machine gets
+    its part positions and its maintenance positions sorted by due date, so
+    overdue and upcoming tasks are two bisects. A machine's parts are ranked
+    by BM25 against the error's description and solution on first use, and
+    the ranking is kept for the life of the snapshot.
+    """
+
+    def __init__(self, errors, parts, maintenance, parts_bm25: BM25Index):
+        self._errors = errors
+        self._parts = parts
+        self._parts_bm25 = parts_bm25
+        self._machine_parts = {}
+        for position, record in enumerate(parts):
+            self._machine_parts.setdefault(record.machine_key, []).append(position)
+        self._machine_tasks = {}
+        for position, record in enumerate(maintenance):
+            if record.due is not None:
+                self._machine_tasks.setdefault(record.machine_key, []).append(position)
+        self._machine_dues = {}
+        for key, positions in self._machine_tasks.items():
+            positions.sort(key=lambda i: maintenance[i].due)
+            self._machine_dues[key] = [maintenance[i].due for i in positions]
+        self._ranked = {}
+
+    def parts(self, error_position: int) -> list:
+        """(part position, score) pairs of the error's machine, parts sharing terms with the error first."""
+        ranked = self._ranked.get(error_position)
+        if ranked is None:
+            error = self._errors[error_position]
+            positions = self._machine_parts.get(error.machine_key, [])
+            scores = self._parts_bm25.scores(error_text(error.row))
+            matched = sorted((i for i in positions if self._parts[i].row_id in scores),
+                             key=lambda i: -scores[self._parts[i].row_id])
+            ranked = self._ranked[error_position] = (
+                [(i, scores[self._parts[i].row_id]) for i in matched]
+                + [(i, None) for i in positions if self._parts[i].row_id not in scores]
+            )
+        return ranked
+
+    def tasks(self, error_position: int, start=None, end=None) -> list:
+        """Maintenance positions of the error's machine due within [start, end] (ordinals), earliest first."""
+        key = self._errors[error_position].machine_key
+        dues = self._machine_dues.get(key, [])
+        lo = bisect_left(dues, start) if start is not None else 0
+        hi = bisect_right(dues, end) if end is not None else len(dues)
+        return self._machine_tasks.get(key, [])[lo:hi]
+
+
+def rank_text(snapshot, tab: str, term: str, limit: int) -> list:
+    """
+    The `limit` best (row, score) pairs of a tab by BM25, best first. When no
+    word of term starts a term of the tab (e.g. a fragment inside a word), the
+    trigram substring matches are returned instead, in sheet order with score None.
+    """
+    ranked = snapshot.index(f"{tab}_bm25").search(term, limit)
+    if ranked:
+        rows = snapshot.rows_by_ids(tab, [row_id for row_id, _ in ranked], keep_order=True)
+        return [(row, score) for row, (_, score) in zip(rows, ranked)]
+    row_ids = snapshot.index(f"{tab}_text").search(term)
+    return [(row, None) for row in snapshot.rows_by_ids(tab, row_ids)[:limit]]
+
+
+def query_parts(snapshot, machine=None, text=None, availability=None, min_price=None, max_price=None,
+                sort="relevance", limit=20) -> list:
+    """
+    Spare parts matching every given filter as (row, score) pairs, in one pass.
+    Machine, availability and price bounds are a single PartColumns mask; a
+    text filter keeps the masked rows it scores by BM25 (or its trigram
+    substring matches, with score None, when nothing ranks). sort is
+    "relevance" (best score first, sheet order without text), "price_asc" or
+    "price_desc"; parts without a numeric price sort last.
+    """
+    columns = snapshot.index("part_columns")
+    machine_keys = snapshot.index("machine").resolve(machine) if machine else None
+    mask = columns.mask(machine_keys=machine_keys, availability=availability, min_price=min_price, max_price=max_price)
+    scores = None
+    if text:
+        by_id = snapshot.index("spare_parts_bm25").scores(text)
+        ranked = bool(by_id)
+        if not ranked:
+            by_id = dict.fromkeys(snapshot.index("spare_parts_text").search(text))
+        positions = np.fromiter(snapshot.positions("spare_parts", by_id), dtype=np.intp, count=len(by_id))
+        score_values = np.fromiter((np.nan if s is None else s for s in by_id.values()), dtype=np.float64,
+                                   count=len(by_id))
+        keep = mask[positions]
+        order = np.argsort(positions[keep], kind="stable")
+        positions, score_values = positions[keep][order], score_values[keep][order]
+        if ranked:
+            scores = score_values
+    else:
+        positions = np.flatnonzero(mask)
+
+    if sort == "price_asc":
+        order = np.argsort(columns.price[positions], kind="stable")
+    elif sort == "price_desc":
+        order = np.argsort(-columns.price[positions], kind="stable")
+    elif scores is not None:
+        order = np.argsort(-scores, kind="stable")
+    else:
+        order = np.arange(len(positions))
+    order = order[:limit]
+
+    records = snapshot.records("spare_parts")
+    return [
+        (records[position].row, None if scores is None else float(scores[i]))
+        for i, position in zip(order.tolist(), positions[order].tolist())
+    ]
+
+
+def _part_text(row: dict) -> str:
+    return f"{row.get('name', '')} {row.get('description', '')}".upper()
+
+
+def _task_text(row: dict) -> str:
+    return row.get('tasks', '').upper()
+
+
+def _text_builder(index_type, name, tab, text_fn):
+    def build(snapshot, previous):
+        if previous is not None and snapshot.deltas is not None and snapshot.base_version == previous.version:
+            return previous.index(name).updated(snapshot.deltas.get(tab), text_fn)
+        return index_type.from_rows(snapshot.row_ids.get(tab, []), snapshot.rows(tab), text_fn)
+    return build
+
+
+# Per-snapshot indexes, built once per snapshot by Snapshot.index(name).
+# Builders get the snapshot and the previous snapshot it was diffed against (or None).
+INDEX_BUILDERS = {
+    "error_code": lambda snapshot, previous: CodeIndex(snapshot.records("error_codes"), "code_key"),
+    # Part codes can run into the hundred thousands, so their typo dictionary allows one edit
+    "part_code": lambda snapshot, previous: CodeIndex(snapshot.records("spare_parts"), "part_code_key", max_distance=1),
+    "machine": lambda snapshot, previous: MachineIndex(
+        {tab: snapshot.records(tab) for tab in ("error_codes", "spare_parts", "maintenance")}
+    ),
+    "due_date": lambda snapshot, previous: DueDateIndex(snapshot.records("maintenance")),
+    "part_columns": lambda snapshot, previous: PartColumns(snapshot.records("spare_parts")),
+    "spare_parts_text": _text_builder(TrigramIndex, "spare_parts_text", "spare_parts", _part_text),
+    "maintenance_text": _text_builder(TrigramIndex, "maintenance_text", "maintenance", _task_text),
+    "spare_parts_bm25": _text_builder(BM25Index, "spare_parts_bm25", "spare_parts", _part_text),
+    "maintenance_bm25": _text_builder(BM25Index, "maintenance_bm25", "maintenance", _task_text),
+    "error_symptoms": lambda snapshot, previous: SymptomIndex([error_text(row) for row in snapshot.rows("error_codes")]),
+    # Built from another index; Snapshot.index is reentrant
+    "error_join": lambda snapshot, previous: ErrorJoinIndex(
+        snapshot.records("error_codes"), snapshot.records("spare_parts"), snapshot.records("maintenance"),
+        snapshot.index("spare_parts_bm25"),
+    ),
+}
+
+# Tabs each index is built from: a refresh leaving them unchanged carries the index over as is
+INDEX_TABS = {
+    "error_code": ("error_codes",),
+    "part_code": ("spare_parts",),
+    "machine": ("error_codes", "spare_parts", "maintenance"),
+    "due_date": ("maintenance",),
+    "part_columns": ("spare_parts",),
+    "spare_parts_text": ("spare_parts",),
+    "maintenance_text": ("maintenance",),
+    "spare_parts_bm25": ("spare_parts",),
+    "maintenance_bm25": ("maintenance",),
+    "error_symptoms": ("error_codes",),
+    "error_join": ("error_codes", "spare_parts", "maintenance"),
+}
+# Indexes keyed by row id, which their builders update from the deltas instead of rebuilding
+DELTA_INDEXES = ("spare_parts_text", "maintenance_text", "spare_parts_bm25", "maintenance_bm25")
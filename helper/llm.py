@@ -0,0 +1,64 @@
+import os
+import threading
+from dotenv import load_dotenv
+
+from helper.llm_cache import get_chat_model_cache
+
+load_dotenv()
+
+# Defaults for every role; LLM_<ROLE>_MODEL / LLM_<ROLE>_TEMPERATURE override one role
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-1.5-pro")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.1"))
+# "grpc" keeps one multiplexed channel per client; "rest" uses a pooled HTTP session
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "grpc")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# routing: the supervisor and intent extraction; tool_use: the ReAct subagents;
+# synthesis: turning tool results into the final answer
+LLM_ROLES = ("routing", "tool_use", "synthesis")
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def llm_config(role: str) -> dict:
+    """Model settings of a role, from the environment."""
+    if role not in LLM_ROLES:
+        raise ValueError(f"Unknown LLM role '{role}', expected one of {', '.join(LLM_ROLES)}")
+    prefix = f"LLM_{role.upper()}_"
+    return {
+        "model": os.getenv(prefix + "MODEL", LLM_MODEL),
+        "temperature": float(os.getenv(prefix + "TEMPERATURE", LLM_TEMPERATURE)),
+    }
+
+
+def get_llm(role: str = "tool_use"):
+    """
+    Shared chat model for a role, created on first use. Roles with the same
+    settings share one client, and with it one transport, for the life of the
+    process, so graphs and request handlers never build their own. Responses
+    go through the exact-match response cache (helper/llm_cache.py).
+    """
+    config = llm_config(role)
+    key = (config["model"], config["temperature"])
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+
+                api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GOOGLE_API_KEY (or GEMINI_API_KEY) not found in environment variables")
+                client = _clients[key] = ChatGoogleGenerativeAI(
+                    google_api_key=api_key,
+                    transport=LLM_TRANSPORT,
+                    timeout=LLM_TIMEOUT,
+                    max_retries=LLM_MAX_RETRIES,
+                    cache=get_chat_model_cache(),
+                    **config,
+                )
+                print(f"✅ Initialized {config['model']} (temperature {config['temperature']:g}) for {role}")
+    return client
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import warnings
+from collections import OrderedDict
+from dotenv import load_dotenv
+from langchain_core.caches import BaseCache
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.load import dumps, loads
+
+load_dotenv()
+
+# Exact-match cache of LLM responses; "0" turns it off
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+# Responses kept in memory (least recently used evicted first)
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+# Seconds a cached response stays valid, whatever the data version
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+# SQLite file for a second, on-disk tier shared across restarts (off when unset)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text) -> str:
+    """Collapse whitespace and case, so "What is  E-352?" and "what is e-352?" share a key."""
+    return _WHITESPACE.sub(" ", str(text)).strip().casefold()
+
+
+def current_data_version():
+    """Version of the sheet data the tools answer from, or None if it is unknown."""
+    try:
+        from helper.sqlite_store import get_sqlite_store, use_sqlite_backend
+
+        if use_sqlite_backend():
+            return get_sqlite_store().mirrored_version()
+        from helper.snapshot import get_snapshot
+
+        return get_snapshot().version
+    except Exception as e:
+        print(f"⚠️ LLM cache bypassed, data version unavailable: {e}")
+        return None
+
+
+class ResponseCache:
+    """
+    Two-tier key/value cache for LLM responses: an in-memory LRU with a TTL,
+    backed by an optional SQLite file. Keys are hashes of everything that
+    determines a response (see make_key), including the data version, so a
+    sheet change makes every older entry unreachable; they age out by LRU/TTL.
+    """
+
+    def __init__(self, max_size: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL, path: str = LLM_CACHE_PATH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._memory = OrderedDict()     # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._disk = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            self._disk.commit()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self._disk is not None:
+                self._disk.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, value, expires_at))
+                self._disk.commit()
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache")
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "disk_tier": self._disk is not None,
+        }
+
+
+def _loads(value: str):
+    # Only values this module serialized itself are loaded, so the loader's notices are noise
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", LangChainBetaWarning)
+        warnings.simplefilter("ignore", PendingDeprecationWarning)
+        return loads(value)
+
+
+def _normalize_messages(prompt: str) -> list:
+    """The parts of a serialized message list that determine the answer; ids and metadata are left out."""
+    normalized = []
+    for message in _loads(prompt):
+        content = message.content if isinstance(message.content, str) else json.dumps(message.content, sort_keys=True)
+        normalized.append((
+            message.type,
+            normalize_text(content) if message.type == "human" else _WHITESPACE.sub(" ", content).strip(),
+            getattr(message, "name", None),
+            [(call["name"], call["args"]) for call in getattr(message, "tool_calls", None) or []],
+        ))
+    return normalized
+
+
+class LangChainResponseCache(BaseCache):
+    """
+    ResponseCache as a LangChain chat model cache. LangChain passes the
+    serialized messages and the model's settings (including the bound tool
+    schemas) as llm_string; the key adds the current data version. Cached tool
+    calls get fresh ids, so a replayed step never collides with an earlier one.
+    """
+
+    def __init__(self, cache: ResponseCache):
+        self.cache = cache
+
+    def _key(self, prompt: str, llm_string: str):
+        version = current_data_version()
+        if version is None:
+            return None
+        return self.cache.make_key("chat", _normalize_messages(prompt), llm_string, version)
+
+    def lookup(self, prompt: str, llm_string: str):
+        key = self._key(prompt, llm_string)
+        value = self.cache.get(key) if key else None
+        if value is None:
+            return None
+        generations = _loads(value)
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if getattr(message, "tool_calls", None):
+                message.tool_calls = [{**call, "id": str(uuid.uuid4())} for call in message.tool_calls]
+        print("⚡ LLM response served from cache")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val) -> None:
+        key = self._key(prompt, llm_string)
+        if key:
+            self.cache.put(key, dumps(return_val))
+
+    def clear(self, **kwargs) -> None:
+        self.cache.clear()
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
+
+
+def get_chat_model_cache():
+    """The cache to give chat models (None when LLM_CACHE_ENABLED=0)."""
+    return LangChainResponseCache(get_response_cache()) if LLM_CACHE_ENABLED else None
+
+
+def cached_completion(model_name: str, prompt: str, generate) -> str:
+    """generate(prompt) -> text, answered from the cache when the same prompt was seen on the same data."""
+    version = current_data_version() if LLM_CACHE_ENABLED else None
+    if version is None:
+        return generate(prompt)
+    cache = get_response_cache()
+    key = cache.make_key("completion", model_name, normalize_text(prompt), version)
+    text = cache.get(key)
+    if text is None:
+        text = generate(prompt)
+        cache.put(key, text)
+    else:
+        print("⚡ LLM response served from cache")
+    return text
@@ -0,0 +1,143 @@
+import re
+from datetime import date, datetime
+from enum import IntEnum
+
+_NON_ALNUM = re.compile(r"[^0-9A-Z]+")
+_WORD = re.compile(r"[0-9A-Z]+")
+
+
+class Availability(IntEnum):
+    """Parsed spare part availability."""
+    UNKNOWN = 0
+    IN_STOCK = 1
+    AVAILABLE = 2       # orderable with a delivery time (days/weeks)
+    OUT_OF_STOCK = 3
+
+    @classmethod
+    def from_status(cls, status: str) -> "Availability":
+        """Map a tool argument ('in_stock', 'available', 'out_of_stock') to the enum."""
+        return cls[status.upper()]
+
+
+def parse_price(value):
+    """Convert a sheet price such as '₹15,750' to a float, or None if it is not a number."""
+    try:
+        return float(str(value).replace('₹', '').replace(',', ''))
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_due_date(value):
+    """Normalize a YYYY-MM-DD due date, or None if it is not a valid date."""
+    ordinal = parse_date_ordinal(value)
+    return date.fromordinal(ordinal).isoformat() if ordinal is not None else None
+
+
+def parse_date_ordinal(value):
+    """Convert a YYYY-MM-DD date to its proleptic Gregorian ordinal, or None if it is not a valid date."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except (ValueError, TypeError):
+        return None
+
+
+def normalize_key(value) -> str:
+    """Canonical lookup key of a code or machine name: E-352, e352 and "E 352" all become E352."""
+    return _NON_ALNUM.sub("", str(value).upper())
+
+
+def tokenize(text) -> list:
+    """Upper-cased alphanumeric words of a text, the terms of keyword ranking."""
+    return _WORD.findall(str(text).upper())
+
+
+def machine_aliases(name) -> set:
+    """
+    Keys a machine name can be looked up by: the whole name and each leading run
+    of its words, plus the words themselves ("BOBST-SP102" -> BOBSTSP102, BOBST, SP102).
+    """
+    words = [word for word in _NON_ALNUM.split(str(name).upper()) if word]
+    aliases = set(words)
+    for end in range(1, len(words) + 1):
+        aliases.add("".join(words[:end]))
+    return aliases
+
+
+def parse_availability(value) -> Availability:
+    """Map free-text availability to an Availability value."""
+    availability = str(value).lower()
+    if "in stock" in availability:
+        return Availability.IN_STOCK
+    if "day" in availability or "week" in availability:
+        return Availability.AVAILABLE
+    if "out of stock" in availability or "unavailable" in availability:
+        return Availability.OUT_OF_STOCK
+    return Availability.UNKNOWN
+
+
+# Records keep references to the strings of the snapshot's row dicts, so the
+# only new objects per row are the record itself and its parsed numbers.
+
+class ErrorCodeRecord:
+    __slots__ = ("row_id", "row", "machine", "machine_key", "code", "code_key")
+
+    def __init__(self, row_id: int, row: dict):
+        self.row_id = row_id
+        self.row = row
+        self.machine = row.get('machine', '')
+        self.machine_key = normalize_key(self.machine)
+        self.code = row.get('code', '')
+        self.code_key = normalize_key(self.code)
+
+
+class SparePartRecord:
+    __slots__ = ("row_id", "row", "machine", "machine_key", "part_code", "part_code_key", "name", "description",
+                 "price", "availability")
+
+    def __init__(self, row_id: int, row: dict):
+        self.row_id = row_id
+        self.row = row
+        self.machine = row.get('machine', '')
+        self.machine_key = normalize_key(self.machine)
+        self.part_code = row.get('part_code', '')
+        self.part_code_key = normalize_key(self.part_code)
+        self.name = row.get('name', '')
+        self.description = row.get('description', '')
+        self.price = parse_price(row.get('price', ''))
+        self.availability = parse_availability(row.get('availability', ''))
+
+
+class MaintenanceRecord:
+    __slots__ = ("row_id", "row", "machine", "machine_key", "tasks", "due")
+
+    def __init__(self, row_id: int, row: dict):
+        self.row_id = row_id
+        self.row = row
+        self.machine = row.get('machine', '')
+        self.machine_key = normalize_key(self.machine)
+        self.tasks = row.get('tasks', '')
+        self.due = parse_date_ordinal(row.get('next_due', ''))
+
+
+RECORD_TYPES = {
+    "error_codes": ErrorCodeRecord,
+    "spare_parts": SparePartRecord,
+    "maintenance": MaintenanceRecord,
+}
+
+
+def build_records(tab_name: str, row_ids: list, rows: list, previous_records=None, sources=None) -> list:
+    """
+    Build the typed records of a tab. sources[i] is the position of row i in the
+    previous snapshot when the row is unchanged (-1 otherwise), so those records
+    are reused instead of parsed again.
+    """
+    record_type = RECORD_TYPES.get(tab_name)
+    if record_type is None:
+        return []
+    if previous_records is None or sources is None:
+        return [record_type(row_id, row) for row_id, row in zip(row_ids, rows)]
+    return [
+        previous_records[src] if src >= 0 else record_type(row_id, row)
+        for row_id, row, src in zip(row_ids, rows, sources)
+    ]
@@ -0,0 +1,134 @@
+import functools
+import json
+import os
+from typing import List, Optional
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+load_dotenv()
+
+# Approximate tokens one tool message may use; rows past it are left for the next page
+TOOL_TOKEN_BUDGET = int(os.getenv("TOOL_TOKEN_BUDGET", "1500"))
+# Longer cell values are clipped, so one long description cannot use up the budget
+TOOL_MAX_CELL_CHARS = int(os.getenv("TOOL_MAX_CELL_CHARS", "300"))
+
+
+class ShapingArgs(BaseModel):
+    """Arguments every tool accepts to shape its result."""
+    fields: Optional[List[str]] = Field(
+        default=None, description="Only return these columns (optional), e.g., ['part_code', 'price']."
+    )
+    max_rows: Optional[int] = Field(default=None, ge=1, description="Maximum number of rows to return (optional).")
+    cursor: Optional[str] = Field(
+        default=None,
+        description="The next_cursor of a previous call with the same arguments, to get the following rows (optional).",
+    )
+
+
+def estimate_tokens(value) -> int:
+    """Rough token count of a JSON-encoded value (about four characters per token)."""
+    return len(json.dumps(value, ensure_ascii=False)) // 4 + 1
+
+
+def _clip(value):
+    if isinstance(value, str) and len(value) > TOOL_MAX_CELL_CHARS:
+        return value[:TOOL_MAX_CELL_CHARS - 1] + "…"
+    return value
+
+
+def shape_results(rows: list, fields=None, max_rows=None, cursor=None, token_budget: int = TOOL_TOKEN_BUDGET,
+                  cursor_arg: str = "cursor") -> dict:
+    """
+    Encode rows (dicts) as one table: the column names once, then one list of
+    values per row. Only the requested fields are kept, rows start at the
+    cursor, and rows are added until max_rows or the token budget is reached
+    (always at least one). next_cursor is set when rows are left, and the note
+    names the tool argument (cursor_arg) to pass it back in.
+    """
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    if fields:
+        projected = [column for column in columns if column in fields]
+        columns = projected or columns
+    try:
+        start = max(int(cursor), 0) if cursor else 0
+    except ValueError:
+        print(f"⚠️ Ignoring invalid cursor: {cursor}")
+        start = 0
+
+    result = {"columns": columns, "rows": [], "total": len(rows)}
+    used = estimate_tokens(result) + 20     # room for next_cursor and the note
+    end = len(rows) if max_rows is None else min(len(rows), start + max_rows)
+    position = start
+    while position < end:
+        values = [_clip(rows[position].get(column)) for column in columns]
+        cost = estimate_tokens(values)
+        if result["rows"] and used + cost > token_budget:
+            break
+        result["rows"].append(values)
+        used += cost
+        position += 1
+
+    if position < len(rows):
+        result["next_cursor"] = str(position)
+        result["note"] = (f"Showing rows {start + 1}-{position} of {len(rows)}. "
+                          f"Call again with {cursor_arg}='{position}' for more, or narrow the query.")
+    return result
+
+
+def staleness() -> dict:
+    """
+    {"stale": True, "stale_reason": ...} while the data source is failing and
+    last-known-good data is served, else {}. With the SQLite backend tools never
+    read the snapshot, so the mirror's version and sync time are returned instead.
+    """
+    from helper.snapshot import get_snapshot
+    from helper.sqlite_store import get_sqlite_store, use_sqlite_backend
+
+    if use_sqlite_backend():
+        return get_sqlite_store().mirror_info()
+    snapshot = get_snapshot()
+    if not snapshot.stale:
+        return {}
+    return {"stale": True, "stale_reason": snapshot.stale_reason}
+
+
+def grouped_rows(keys, lookup) -> tuple:
+    """
+    Run lookup(key) for every distinct key (in the given order) and return
+    their rows as one list, each prefixed with the key that found it in a
+    "query" column, plus the keys that found nothing.
+    """
+    rows, not_found = [], []
+    for key in dict.fromkeys(keys):
+        found = lookup(key)
+        rows += [{"query": key, **row} for row in found]
+        if not found:
+            not_found.append(key)
+    return rows, not_found
+
+
+def shaped(func):
+    """
+    Decorator for tool functions returning a list of row dicts: the tool also
+    takes the ShapingArgs and returns a dict, the shape_results() table of its
+    rows ({"columns", "rows", "total"}, plus "next_cursor" and "note" when rows
+    are left) with the staleness() keys. A function may return (rows, extras)
+    to add the extras dict to the result, e.g. {"not_found": [...]}.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, fields=None, max_rows=None, cursor=None, **kwargs):
+        rows, extras = func(*args, **kwargs), None
+        if isinstance(rows, tuple):
+            rows, extras = rows
+        if fields and rows and "query" in rows[0]:
+            # Batch results stay grouped by key whatever the projection
+            fields = ["query", *fields]
+        result = shape_results(rows, fields=fields, max_rows=max_rows, cursor=cursor)
+        if extras:
+            result.update(extras)
+        result.update(staleness())
+        if "next_cursor" in result:
+            print(f"✂️ {func.__name__}: returned {len(result['rows'])} of {len(rows)} rows "
+                  f"(~{estimate_tokens(result)} tokens)")
+        return result
+    return wrapper
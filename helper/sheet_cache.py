@@ -0,0 +1,311 @@
+import os
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Seconds a cached tab is served without touching the network
+SHEETS_CACHE_TTL = float(os.getenv("SHEETS_CACHE_TTL", "300"))
+# Minimum seconds between two revision checks of the same spreadsheet
+SHEETS_REVISION_CHECK_INTERVAL = float(os.getenv("SHEETS_REVISION_CHECK_INTERVAL", "60"))
+# Seconds past expiry an entry is still served while it is reloaded in the background
+SHEETS_STALE_TTL = float(os.getenv("SHEETS_STALE_TTL", "3600"))
+# The background refresher wakes up every SHEETS_REFRESH_INTERVAL seconds and reloads
+# entries expiring within SHEETS_REFRESH_AHEAD seconds
+SHEETS_REFRESH_INTERVAL = float(os.getenv("SHEETS_REFRESH_INTERVAL", "15"))
+SHEETS_REFRESH_AHEAD = float(os.getenv("SHEETS_REFRESH_AHEAD", "30"))
+# Seconds to wait before retrying a failed background reload
+SHEETS_REFRESH_RETRY = float(os.getenv("SHEETS_REFRESH_RETRY", "30"))
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "revision", "loader", "retry_at")
+
+    def __init__(self, value, expires_at, revision, loader):
+        self.value = value
+        self.expires_at = expires_at
+        self.revision = revision
+        self.loader = loader
+        self.retry_at = 0.0
+
+
+class _Flight:
+    """A load in progress; concurrent callers for the same key wait on it instead of loading again."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SheetCache:
+    """
+    Process-wide snapshot cache for sheet data keyed by (spreadsheet, tab, range).
+
+    Entries are served from memory until their TTL runs out. When a revision
+    function is configured, the spreadsheet revision is polled at most once per
+    check interval: a changed revision expires every entry of that spreadsheet,
+    and an expired entry whose revision is unchanged is renewed without a reload.
+
+    Expired entries are served stale (for up to stale_ttl seconds) while a
+    background thread reloads them, and the optional refresher thread reloads
+    entries before they expire, so readers only wait on the network for the
+    very first load. A failed reload keeps the last good value and is counted
+    in stats(). Concurrent misses for the same key share a single load.
+    """
+
+    def __init__(self, ttl=SHEETS_CACHE_TTL, revision_fn=None,
+                 revision_check_interval=SHEETS_REVISION_CHECK_INTERVAL, stale_ttl=SHEETS_STALE_TTL):
+        self.ttl = ttl
+        self.revision_fn = revision_fn
+        self.revision_check_interval = revision_check_interval
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._revisions = {}     # spreadsheet_id -> (revision, checked_at)
+        self._refreshing = set()
+        self._checking = set()
+        self._inflight = {}      # key -> _Flight
+        self._lock = threading.RLock()
+        self._refresher = None
+        self._refresher_stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.revalidations = 0
+        self.invalidations = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.last_refresh_at = None
+        self.last_refresh_error = None
+
+    def _current_revision(self, spreadsheet_id, now, force=False):
+        """Return the known revision of a spreadsheet, polling it if the last check is too old."""
+        if self.revision_fn is None:
+            return None
+        with self._lock:
+            known = self._revisions.get(spreadsheet_id)
+        if known and not force and now - known[1] < self.revision_check_interval:
+            return known[0]
+
+        try:
+            revision = self.revision_fn(spreadsheet_id)
+        except Exception as e:
+            print(f"⚠️ Could not read revision of spreadsheet {spreadsheet_id}: {e}")
+            revision = None
+
+        with self._lock:
+            self._revisions[spreadsheet_id] = (revision, now)
+            if known and revision is not None and known[0] is not None and revision != known[0]:
+                print(f"🔄 Spreadsheet {spreadsheet_id} changed (revision {known[0]} -> {revision}), expiring cache")
+                self._expire_spreadsheet(spreadsheet_id)
+        return revision
+
+    def _expire_spreadsheet(self, spreadsheet_id):
+        """Mark the spreadsheet's entries expired; they are served stale until reloaded."""
+        for key, entry in self._entries.items():
+            if key[0] == spreadsheet_id:
+                entry.expires_at = 0.0
+                entry.revision = None
+                self.invalidations += 1
+
+    def _drop_spreadsheet(self, spreadsheet_id):
+        for key in [k for k in self._entries if k[0] == spreadsheet_id]:
+            del self._entries[key]
+            self.invalidations += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for key. Only a miss (or an entry older than the
+        stale window) calls loader() inline, and concurrent misses for the same
+        key wait for that one call; revision polls and reloads of cached entries
+        run in the background.
+        """
+        spreadsheet_id = key[0]
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._schedule_revision_check(spreadsheet_id, now)
+                if now < entry.expires_at:
+                    self.hits += 1
+                    return entry.value
+                if now < entry.expires_at + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._schedule_refresh(key, entry, now)
+                    return entry.value
+            self.misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            revision = self._current_revision(spreadsheet_id, now)
+            flight.value = loader()
+            with self._lock:
+                self._entries[key] = _Entry(flight.value, time.monotonic() + self.ttl, revision, loader)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    # --- Background refresh -------------------------------------------------
+
+    def _schedule_revision_check(self, spreadsheet_id, now):
+        """Poll the spreadsheet revision in the background when the last check is too old."""
+        if self.revision_fn is None or spreadsheet_id in self._checking:
+            return
+        known = self._revisions.get(spreadsheet_id)
+        if known and now - known[1] < self.revision_check_interval:
+            return
+        self._checking.add(spreadsheet_id)
+
+        def check():
+            try:
+                self._current_revision(spreadsheet_id, time.monotonic())
+            finally:
+                with self._lock:
+                    self._checking.discard(spreadsheet_id)
+
+        threading.Thread(target=check, name="sheet-cache-revision", daemon=True).start()
+
+    def _schedule_refresh(self, key, entry, now):
+        """Start a background reload of key unless one is running or the last one failed recently."""
+        if key in self._refreshing or now < entry.retry_at:
+            return
+        self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key,), name="sheet-cache-refresh", daemon=True).start()
+
+    def _refresh(self, key):
+        """Reload one entry and swap the new value in. On failure the old value stays in place."""
+        try:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                return
+            now = time.monotonic()
+            revision = self._current_revision(key[0], now)
+            with self._lock:
+                if revision is not None and revision == entry.revision:
+                    entry.expires_at = now + self.ttl
+                    self.revalidations += 1
+                    return
+
+            try:
+                value = entry.loader()
+            except Exception as e:
+                print(f"⚠️ Background refresh of {key} failed, serving last good data: {e}")
+                with self._lock:
+                    entry.retry_at = time.monotonic() + SHEETS_REFRESH_RETRY
+                    self.refresh_failures += 1
+                    self.last_refresh_error = f"{datetime.now().isoformat(timespec='seconds')} {type(e).__name__}: {e}"
+                return
+
+            with self._lock:
+                # Skip the swap if the entry was invalidated while loading
+                if self._entries.get(key) is entry:
+                    self._entries[key] = _Entry(value, time.monotonic() + self.ttl, revision, entry.loader)
+                self.refreshes += 1
+                self.last_refresh_at = datetime.now().isoformat(timespec="seconds")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def refresh_expiring(self, ahead=SHEETS_REFRESH_AHEAD):
+        """Reload every entry that expires within `ahead` seconds (or is already expired)."""
+        now = time.monotonic()
+        with self._lock:
+            spreadsheet_ids = {key[0] for key in self._entries}
+        # A revision poll expires the entries of a changed spreadsheet, making them due below
+        for spreadsheet_id in spreadsheet_ids:
+            self._current_revision(spreadsheet_id, now)
+        with self._lock:
+            due = [key for key, entry in self._entries.items()
+                   if entry.expires_at - now <= ahead and key not in self._refreshing and now >= entry.retry_at]
+            self._refreshing.update(due)
+        for key in due:
+            self._refresh(key)
+
+    def start_refresher(self, interval=SHEETS_REFRESH_INTERVAL, ahead=SHEETS_REFRESH_AHEAD):
+        """Start the daemon thread that keeps cached entries loaded ahead of their expiry."""
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher_stop.clear()
+            self._refresher = threading.Thread(
+                target=self._run_refresher, args=(interval, ahead), name="sheet-cache-refresher", daemon=True
+            )
+            self._refresher.start()
+        print(f"🔁 Sheet cache refresher started (every {interval:g}s, {ahead:g}s ahead of expiry)")
+
+    def stop_refresher(self):
+        self._refresher_stop.set()
+
+    def _run_refresher(self, interval, ahead):
+        while not self._refresher_stop.wait(interval):
+            try:
+                self.refresh_expiring(ahead)
+            except Exception as e:
+                print(f"❌ Sheet cache refresher error: {e}")
+
+    def peek(self, key):
+        """Return the last value loaded for key however old it is, or None. Never loads."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def discard(self, key):
+        """Drop a single entry so the next lookup loads it again."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate(self, spreadsheet_id=None):
+        """Drop cached entries for one spreadsheet, or everything when no id is given."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._revisions.clear()
+            else:
+                self._drop_spreadsheet(spreadsheet_id)
+                self._revisions.pop(spreadsheet_id, None)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "coalesced": self.coalesced,
+                "revalidations": self.revalidations,
+                "invalidations": self.invalidations,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "ttl_seconds": self.ttl,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+                "last_refresh_at": self.last_refresh_at,
+                "last_refresh_error": self.last_refresh_error,
+                "refresher_running": self._refresher is not None and self._refresher.is_alive(),
+            }
@@ -0,0 +1,308 @@
+import copy
+import hashlib
+import threading
+from datetime import datetime
+
+from helper.indexes import DELTA_INDEXES, INDEX_BUILDERS, INDEX_TABS
+from helper.records import build_records
+
+# Tabs loaded together into every snapshot
+SNAPSHOT_TABS = ("error_codes", "spare_parts", "maintenance")
+SNAPSHOT_RANGE = "A:Z"
+# Columns the tools and agents read; other sheet columns are not downloaded
+SNAPSHOT_COLUMNS = {
+    "error_codes": ("machine", "code", "description", "solution"),
+    "spare_parts": ("machine", "part_code", "name", "description", "price", "availability"),
+    "maintenance": ("machine", "next_due", "tasks"),
+}
+
+# Columns that identify a row across refreshes, so an edited row is reported as an update
+TAB_KEYS = {
+    "error_codes": ("machine", "code"),
+    "spare_parts": ("part_code",),
+    "maintenance": ("machine", "tasks"),
+}
+
+
+def row_hash(values) -> bytes:
+    """Stable 8-byte digest of a row's cell values."""
+    return hashlib.blake2b("\x1f".join(values).encode("utf-8"), digest_size=8).digest()
+
+
+class TabDelta:
+    """Rows added, updated and removed in one tab since the previous snapshot."""
+
+    __slots__ = ("added", "updated", "removed")
+
+    def __init__(self):
+        self.added = []      # (row_id, row)
+        self.updated = []    # (row_id, old_row, new_row)
+        self.removed = []    # (row_id, old_row)
+
+    def __bool__(self):
+        return bool(self.added or self.updated or self.removed)
+
+    def __repr__(self):
+        return f"<TabDelta +{len(self.added)} ~{len(self.updated)} -{len(self.removed)}>"
+
+
+class Snapshot:
+    """
+    Parsed rows of every tab, loaded together in one refresh.
+
+    Every row carries a row id that stays stable across refreshes while the row
+    exists, and a hash of its cell values. A snapshot built from a previous one
+    records the per-tab deltas against it (deltas is None for a full build).
+    Typed records (parsed prices, due dates, availability) are built once here,
+    so tools never re-parse cell strings, and lookup indexes are built once
+    per snapshot. A stale snapshot is last-known-good data served while the
+    source is failing.
+    """
+
+    def __init__(self, tabs: dict, headers=None, row_ids=None, row_hashes=None,
+                 deltas=None, base_version=None, next_ids=None, records=None):
+        self.tabs = tabs
+        self.headers = headers or {name: list(dict.fromkeys(k for row in rows for k in row)) for name, rows in tabs.items()}
+        self.row_ids = row_ids or {name: list(range(len(rows))) for name, rows in tabs.items()}
+        self.row_hashes = row_hashes or {
+            name: [row_hash([row.get(h, '') for h in self.headers[name]]) for row in rows]
+            for name, rows in tabs.items()
+        }
+        self.next_ids = next_ids or {name: len(rows) for name, rows in tabs.items()}
+        self._records = records or {
+            name: build_records(name, self.row_ids[name], rows) for name, rows in tabs.items()
+        }
+        self.deltas = deltas
+        self.base_version = base_version
+        self.loaded_at = datetime.now()
+        self.stale = False
+        self.stale_reason = None
+        self._indexes = {}
+        self._index_lock = threading.RLock()
+        self._positions = {}
+
+        digest = hashlib.sha1()
+        for name in sorted(tabs):
+            digest.update(name.encode("utf-8"))
+            digest.update("\x1f".join(self.headers[name]).encode("utf-8"))
+            digest.update(b"".join(self.row_hashes[name]))
+        self.version = digest.hexdigest()[:12]
+
+    def rows(self, tab_name: str) -> list:
+        """Return the rows of a tab, or [] if the tab was not loaded."""
+        return self.tabs.get(tab_name, [])
+
+    def records(self, tab_name: str) -> list:
+        """Return the typed records of a tab, in row order, or [] if the tab was not loaded."""
+        return self._records.get(tab_name, [])
+
+    def positions(self, tab_name: str, row_ids) -> list:
+        """Positions of the rows with the given row ids, in the given order."""
+        positions = self._positions.get(tab_name)
+        if positions is None:
+            positions = self._positions[tab_name] = {
+                row_id: position for position, row_id in enumerate(self.row_ids.get(tab_name, []))
+            }
+        return [positions[row_id] for row_id in row_ids]
+
+    def rows_by_ids(self, tab_name: str, row_ids, keep_order: bool = False) -> list:
+        """Return the rows with the given row ids, in sheet order (or in the given order with keep_order)."""
+        rows = self.rows(tab_name)
+        wanted = self.positions(tab_name, row_ids)
+        return [rows[position] for position in (wanted if keep_order else sorted(wanted))]
+
+    def index(self, name: str, previous=None):
+        """
+        Return the named index (see helper.indexes.INDEX_BUILDERS), building it on first use.
+        With the previous snapshot, indexes that support it are updated from the deltas.
+        """
+        index = self._indexes.get(name)
+        if index is None:
+            with self._index_lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = self._indexes[name] = INDEX_BUILDERS[name](self, previous)
+        return index
+
+    def build_indexes(self, previous=None):
+        """
+        Build every index now, so the first tool call after startup does not pay for it.
+
+        With the previous snapshot this one was diffed against, indexes whose tabs
+        are unchanged are carried over, and the row-id keyed text indexes are
+        updated from the deltas. Position-keyed indexes of a changed tab are left
+        to be rebuilt on first use.
+        """
+        if previous is None:
+            for name in INDEX_BUILDERS:
+                self.index(name)
+            return
+        for name in INDEX_BUILDERS:
+            built = previous._indexes.get(name)
+            if built is not None and not any(self.deltas.get(tab) for tab in INDEX_TABS[name]):
+                self._indexes[name] = built
+            elif name in DELTA_INDEXES:
+                self.index(name, previous)
+
+    def as_stale(self, reason: str) -> "Snapshot":
+        """Return a view of this snapshot (sharing all rows) flagged as stale."""
+        stale = copy.copy(self)
+        stale.stale = True
+        stale.stale_reason = reason
+        return stale
+
+    def __repr__(self):
+        counts = ", ".join(f"{name}={len(rows)}" for name, rows in self.tabs.items())
+        return f"<Snapshot {self.version}{' STALE' if self.stale else ''} {counts}>"
+
+
+EMPTY_SNAPSHOT = Snapshot({})
+
+
+def _diff_tab(name, headers, values, previous):
+    """
+    Match the new rows of a tab against the previous snapshot by row hash.
+
+    Unchanged rows keep their row id and reuse the previous row dict; only
+    changed rows are turned into new dicts. A changed row whose key columns
+    match a vanished row is an update, otherwise an add. sources maps each new
+    row to its previous position (-1 for new content), or is None when the tab
+    is unchanged.
+    """
+    prev_rows = previous.tabs[name]
+    prev_ids = previous.row_ids[name]
+    prev_hashes = previous.row_hashes[name]
+    next_id = previous.next_ids[name]
+    hashes = [row_hash(row) for row in values]
+    delta = TabDelta()
+
+    if hashes == prev_hashes:
+        return prev_rows, prev_ids, prev_hashes, next_id, delta, None
+
+    rows = [None] * len(values)
+    ids = [None] * len(values)
+    sources = [-1] * len(values)
+    consumed = [False] * len(prev_rows)
+    pending = []
+
+    # Rows that did not move are matched position by position
+    for i, h in enumerate(hashes):
+        if i < len(prev_hashes) and prev_hashes[i] == h:
+            rows[i], ids[i], consumed[i], sources[i] = prev_rows[i], prev_ids[i], True, i
+        else:
+            pending.append(i)
+
+    if pending:
+        # Rows that moved are matched by hash
+        by_hash = {}
+        for pos in range(len(prev_rows) - 1, -1, -1):
+            if not consumed[pos]:
+                by_hash.setdefault(prev_hashes[pos], []).append(pos)
+        changed = []
+        for i in pending:
+            positions = by_hash.get(hashes[i])
+            if positions:
+                pos = positions.pop()
+                rows[i], ids[i], consumed[pos], sources[i] = prev_rows[pos], prev_ids[pos], True, pos
+            else:
+                changed.append(i)
+
+        # Whatever is left is new content: an update when its key matches a vanished row
+        key_columns = TAB_KEYS.get(name, ())
+        by_key = {}
+        for pos in range(len(prev_rows) - 1, -1, -1):
+            if not consumed[pos]:
+                by_key.setdefault(tuple(prev_rows[pos].get(c, '') for c in key_columns), []).append(pos)
+        for i in changed:
+            row = dict(zip(headers, values[i]))
+            rows[i] = row
+            positions = by_key.get(tuple(row.get(c, '') for c in key_columns)) if key_columns else None
+            if positions:
+                pos = positions.pop()
+                consumed[pos] = True
+                ids[i] = prev_ids[pos]
+                delta.updated.append((ids[i], prev_rows[pos], row))
+            else:
+                ids[i] = next_id
+                next_id += 1
+                delta.added.append((ids[i], row))
+
+    delta.removed = [(prev_ids[pos], prev_rows[pos]) for pos, used in enumerate(consumed) if not used]
+    return rows, ids, hashes, next_id, delta, sources
+
+
+def build_snapshot(values_by_tab: dict, previous=None) -> Snapshot:
+    """
+    Build a snapshot from raw sheet values ({tab: [header_row, *rows]}, or
+    {tab: iterator} yielding the header row and then the rows).
+
+    With a previous snapshot whose tabs and headers match, rows are diffed by
+    hash so only added or changed rows are parsed (and their records built), and
+    the resulting snapshot carries the deltas. Otherwise every row is parsed.
+    """
+    headers, normalized = {}, {}
+    for name, values in values_by_tab.items():
+        # values may be a list or an iterator streaming rows in chunks; rows are padded as they arrive
+        values = iter(values)
+        header = list(next(values, []))
+        width = len(header)
+        headers[name] = header
+        normalized[name] = [
+            row if len(row) == width else row[:width] + [''] * (width - len(row))
+            for row in values
+        ]
+
+    incremental = (
+        previous is not None
+        and set(previous.tabs) == set(normalized)
+        and all(previous.headers.get(name) == headers[name] for name in normalized)
+    )
+    if not incremental:
+        tabs = {name: [dict(zip(headers[name], row)) for row in rows] for name, rows in normalized.items()}
+        snapshot = Snapshot(
+            tabs,
+            headers=headers,
+            row_hashes={name: [row_hash(row) for row in rows] for name, rows in normalized.items()},
+        )
+        snapshot.build_indexes()
+        return snapshot
+
+    tabs, row_ids, row_hashes, next_ids, deltas, records = {}, {}, {}, {}, {}, {}
+    for name, rows in normalized.items():
+        tabs[name], row_ids[name], row_hashes[name], next_ids[name], deltas[name], sources = _diff_tab(
+            name, headers[name], rows, previous
+        )
+        if sources is None:
+            records[name] = previous.records(name)
+        else:
+            records[name] = build_records(name, row_ids[name], tabs[name], previous.records(name), sources)
+    snapshot = Snapshot(tabs, headers=headers, row_ids=row_ids, row_hashes=row_hashes,
+                        deltas=deltas, base_version=previous.version, next_ids=next_ids, records=records)
+    snapshot.build_indexes(previous)
+    changes = {name: delta for name, delta in deltas.items() if delta}
+    if changes:
+        print(f"🔀 Snapshot {previous.version} -> {snapshot.version}: {changes}")
+    return snapshot
+
+
+def rows_to_values(rows_by_tab: dict) -> dict:
+    """Convert {tab: [row dicts]} into raw sheet values with a header row, for build_snapshot."""
+    values_by_tab = {}
+    for name, rows in rows_by_tab.items():
+        header = list(dict.fromkeys(key for row in rows for key in row))
+        values_by_tab[name] = [header] + [[row.get(h, '') for h in header] for row in rows] if header else []
+    return values_by_tab
+
+
+def get_snapshot() -> Snapshot:
+    """Return the current snapshot of the configured data source."""
+    from helper.data_source import get_data_source
+
+    return get_data_source().get_snapshot()
+
+
+def refresh_snapshot() -> Snapshot:
+    """Reload the snapshot from the configured data source. Call at startup or to pick up sheet edits."""
+    from helper.data_source import get_data_source
+
+    return get_data_source().refresh()
@@ -0,0 +1,594 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from dotenv import load_dotenv
+
+from helper.fuzzy import FuzzyMatcher
+from helper.indexes import SymptomIndex, error_text
+from helper.records import machine_aliases, normalize_key, parse_availability, parse_due_date, parse_price, tokenize
+
+load_dotenv()
+
+# "sheets" serves tools from the in-memory snapshot, "sqlite" from the local mirror
+TOOLS_BACKEND = os.getenv("TOOLS_BACKEND", "sheets").lower()
+SQLITE_MIRROR_PATH = os.getenv(
+    "SQLITE_MIRROR_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "sheets_mirror.db"),
+)
+
+# Seconds between two checks of the data source for a snapshot the mirror does not hold yet
+SQLITE_SYNC_INTERVAL = float(os.getenv("SQLITE_SYNC_INTERVAL", "30"))
+
+# Bump when SCHEMA changes; a mirror built with an older schema is dropped and re-synced
+SCHEMA_VERSION = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS error_codes (
+    id INTEGER PRIMARY KEY,
+    machine TEXT COLLATE NOCASE,
+    machine_key TEXT,
+    code TEXT COLLATE NOCASE,
+    code_key TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_error_codes_code_key ON error_codes(code_key);
+CREATE INDEX IF NOT EXISTS idx_error_codes_machine ON error_codes(machine_key);
+
+CREATE TABLE IF NOT EXISTS spare_parts (
+    id INTEGER PRIMARY KEY,
+    machine TEXT COLLATE NOCASE,
+    machine_key TEXT,
+    part_code TEXT COLLATE NOCASE,
+    part_code_key TEXT,
+    name TEXT,
+    description TEXT,
+    price REAL,
+    availability_status TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_spare_parts_code_key ON spare_parts(part_code_key);
+CREATE INDEX IF NOT EXISTS idx_spare_parts_machine ON spare_parts(machine_key);
+CREATE INDEX IF NOT EXISTS idx_spare_parts_price ON spare_parts(price);
+CREATE INDEX IF NOT EXISTS idx_spare_parts_availability ON spare_parts(availability_status);
+
+CREATE TABLE IF NOT EXISTS maintenance (
+    id INTEGER PRIMARY KEY,
+    machine TEXT COLLATE NOCASE,
+    machine_key TEXT,
+    next_due TEXT,
+    tasks TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_maintenance_machine ON maintenance(machine_key);
+CREATE INDEX IF NOT EXISTS idx_maintenance_next_due ON maintenance(next_due);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS spare_parts_fts USING fts5(
+    name, description, content='spare_parts', content_rowid='id', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS maintenance_fts USING fts5(
+    tasks, content='maintenance', content_rowid='id', tokenize='trigram'
+);
+
+-- Every alias of every machine (see records.machine_aliases), rebuilt on each sync
+CREATE TABLE IF NOT EXISTS machine_aliases (
+    alias TEXT NOT NULL,
+    machine_key TEXT NOT NULL,
+    PRIMARY KEY (alias, machine_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_machine_aliases_key ON machine_aliases(machine_key);
+
+CREATE TABLE IF NOT EXISTS mirror_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+MIRROR_TABS = ("error_codes", "spare_parts", "maintenance")
+TABLE_COLUMNS = {
+    "error_codes": ("id", "machine", "machine_key", "code", "code_key", "data"),
+    "spare_parts": ("id", "machine", "machine_key", "part_code", "part_code_key", "name", "description", "price",
+                    "availability_status", "data"),
+    "maintenance": ("id", "machine", "machine_key", "next_due", "tasks", "data"),
+}
+FTS_TABLES = {"spare_parts": "spare_parts_fts", "maintenance": "maintenance_fts"}
+FTS_COLUMNS = {"spare_parts": ("name", "description"), "maintenance": ("tasks",)}
+
+
+def use_sqlite_backend() -> bool:
+    """True when the tools should query the SQLite mirror instead of the in-memory snapshot."""
+    return TOOLS_BACKEND == "sqlite"
+
+
+def availability_status(value):
+    """Map free-text availability to in_stock, available or out_of_stock (None if unknown)."""
+    status = parse_availability(value)
+    return status.name.lower() if status else None
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _successor(prefix: str) -> str:
+    """Smallest string greater than every string starting with prefix."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SqliteStore:
+    """Local SQLite mirror of the sheet tabs with B-tree indexes and FTS5 text search."""
+
+    def __init__(self, path=SQLITE_MIRROR_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._symptoms = (None, None, None, None)     # (mirrored version, error rows, their machine keys, SymptomIndex)
+        self._matchers = {}     # name -> (mirrored version, FuzzyMatcher)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._migrate()
+
+    def _migrate(self):
+        """Create the schema, dropping a mirror built with an older one (it is re-synced from the source)."""
+        conn = self.connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # Virtual (FTS) tables first, they own shadow tables
+            tables = [name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+                "ORDER BY sql LIKE 'CREATE VIRTUAL TABLE%' DESC"
+            )]
+            if tables:
+                print(f"⚠️ SQLite mirror schema {version} is outdated, rebuilding as {SCHEMA_VERSION}")
+            for table in tables:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.executescript(SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Sync -------------------------------------------------------------
+
+    @staticmethod
+    def _insert_params(tab: str, row_id: int, row: dict) -> tuple:
+        data = json.dumps(row, ensure_ascii=False)
+        machine = row.get('machine', '')
+        if tab == "error_codes":
+            return (row_id, machine, normalize_key(machine), row.get('code', ''), normalize_key(row.get('code', '')), data)
+        if tab == "spare_parts":
+            return (row_id, machine, normalize_key(machine), row.get('part_code', ''),
+                    normalize_key(row.get('part_code', '')), row.get('name', ''),
+                    row.get('description', ''), parse_price(row.get('price', '')),
+                    availability_status(row.get('availability', '')), data)
+        return (row_id, machine, normalize_key(machine), parse_due_date(row.get('next_due', '')),
+                row.get('tasks', ''), data)
+
+    @staticmethod
+    def _fts_values(tab: str, row: dict) -> tuple:
+        if tab == "spare_parts":
+            return (row.get('name', ''), row.get('description', ''))
+        return (row.get('tasks', ''),)
+
+    def mirrored_version(self):
+        """Snapshot version the mirror currently holds, or None."""
+        row = self.connection().execute("SELECT value FROM mirror_meta WHERE key = 'version'").fetchone()
+        return row[0] if row else None
+
+    def mirror_info(self) -> dict:
+        """Snapshot version the mirror holds and when it was synced, e.g. to show next to tool results."""
+        meta = dict(self.connection().execute(
+            "SELECT key, value FROM mirror_meta WHERE key IN ('version', 'synced_at')"
+        ).fetchall())
+        return {"data_version": meta.get("version"), "synced_at": meta.get("synced_at")}
+
+    def sync(self, snapshot) -> dict:
+        """
+        Mirror a snapshot. When the snapshot carries deltas against the version
+        already mirrored, only the added, updated and removed rows (and their
+        FTS entries) are written; otherwise every table is rewritten.
+        """
+        with self._sync_lock:
+            conn = self.connection()
+            incremental = snapshot.deltas is not None and snapshot.base_version == self.mirrored_version()
+            with conn:
+                if incremental:
+                    for tab in MIRROR_TABS:
+                        self._apply_delta(conn, tab, snapshot.deltas.get(tab))
+                else:
+                    for tab in MIRROR_TABS:
+                        conn.execute(f"DELETE FROM {tab}")
+                        conn.executemany(
+                            f"INSERT INTO {tab} ({', '.join(TABLE_COLUMNS[tab])}) "
+                            f"VALUES ({', '.join('?' * len(TABLE_COLUMNS[tab]))})",
+                            [self._insert_params(tab, row_id, row)
+                             for row_id, row in zip(snapshot.row_ids.get(tab, []), snapshot.rows(tab))],
+                        )
+                    conn.execute("INSERT INTO spare_parts_fts(spare_parts_fts) VALUES ('rebuild')")
+                    conn.execute("INSERT INTO maintenance_fts(maintenance_fts) VALUES ('rebuild')")
+                self._sync_machine_aliases(conn)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO mirror_meta (key, value) VALUES (?, ?)",
+                    [("version", snapshot.version), ("synced_at", datetime.now().isoformat(timespec="seconds"))],
+                )
+            if not incremental:
+                conn.execute("ANALYZE")
+
+        counts = {tab: self.row_count(tab) for tab in MIRROR_TABS}
+        mode = "delta" if incremental else "full"
+        print(f"💾 Synced SQLite mirror at {self.path} ({mode}): {counts}")
+        return counts
+
+    def _apply_delta(self, conn, tab: str, delta):
+        if not delta:
+            return
+        fts = FTS_TABLES.get(tab)
+        columns = TABLE_COLUMNS[tab]
+        insert_sql = f"INSERT INTO {tab} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+        stale = [(row_id, old_row) for row_id, old_row in delta.removed]
+        stale += [(row_id, old_row) for row_id, old_row, _ in delta.updated]
+        fresh = [(row_id, row) for row_id, row in delta.added]
+        fresh += [(row_id, new_row) for row_id, _, new_row in delta.updated]
+
+        if fts:
+            fts_columns = FTS_COLUMNS[tab]
+            conn.executemany(
+                f"INSERT INTO {fts} ({fts}, rowid, {', '.join(fts_columns)}) "
+                f"VALUES ('delete', ?, {', '.join('?' * len(fts_columns))})",
+                [(row_id, *self._fts_values(tab, row)) for row_id, row in stale],
+            )
+        conn.executemany(f"DELETE FROM {tab} WHERE id = ?", [(row_id,) for row_id, _ in stale])
+        conn.executemany(insert_sql, [self._insert_params(tab, row_id, row) for row_id, row in fresh])
+        if fts:
+            conn.executemany(
+                f"INSERT INTO {fts} (rowid, {', '.join(fts_columns)}) VALUES (?, {', '.join('?' * len(fts_columns))})",
+                [(row_id, *self._fts_values(tab, row)) for row_id, row in fresh],
+            )
+
+    @staticmethod
+    def _sync_machine_aliases(conn):
+        """Rebuild the alias table from the distinct machines of all tabs (a few rows, read through the key indexes)."""
+        machines = conn.execute(
+            "SELECT machine_key, MIN(machine) FROM ("
+            + " UNION ALL ".join(f"SELECT machine_key, machine FROM {tab}" for tab in MIRROR_TABS)
+            + ") WHERE machine_key != '' GROUP BY machine_key"
+        ).fetchall()
+        conn.execute("DELETE FROM machine_aliases")
+        conn.executemany(
+            "INSERT OR IGNORE INTO machine_aliases (alias, machine_key) VALUES (?, ?)",
+            [(alias, key) for key, name in machines for alias in machine_aliases(name)],
+        )
+
+    def row_count(self, tab: str) -> int:
+        return self.connection().execute(f"SELECT COUNT(*) FROM {tab}").fetchone()[0]
+
+    def is_empty(self) -> bool:
+        return all(self.row_count(tab) == 0 for tab in MIRROR_TABS)
+
+    # --- Queries ----------------------------------------------------------
+
+    def _rows(self, sql: str, params=()) -> list:
+        return [json.loads(data) for (data,) in self.connection().execute(sql, params)]
+
+    def _prefix_then_substring(self, tab: str, column: str, key: str) -> list:
+        """
+        Prefix match on a normalized key column first, as a range seek on its
+        index (LIKE cannot use a BINARY index); fall back to a substring scan
+        only when it finds nothing.
+        """
+        results = self._rows(
+            f"SELECT data FROM {tab} WHERE {column} >= ? AND {column} < ? ORDER BY id", (key, _successor(key))
+        )
+        if results:
+            return results
+        return self._rows(f"SELECT data FROM {tab} WHERE instr({column}, ?) > 0 ORDER BY id", (key,))
+
+    def _nearest(self, name: str, keys_sql: str, key: str, max_distance: int) -> list:
+        """
+        FuzzyMatcher.nearest over the keys selected by keys_sql. The matcher is
+        built on the first miss and kept until the mirrored version changes.
+        """
+        version = self.mirrored_version()
+        cached = self._matchers.get(name)
+        if cached is None or cached[0] != version:
+            keys = [k for (k,) in self.connection().execute(keys_sql)]
+            cached = self._matchers[name] = (version, FuzzyMatcher(keys, max_distance))
+        return cached[1].nearest(key)
+
+    def resolve_machine(self, machine: str) -> list:
+        """
+        Keys of the machines a name refers to, like MachineIndex.resolve: by alias,
+        else by substring, else by the aliases within two edits.
+        """
+        key = normalize_key(machine)
+        if not key:
+            return []
+        conn = self.connection()
+        keys = [k for (k,) in conn.execute(
+            "SELECT machine_key FROM machine_aliases WHERE alias = ? ORDER BY machine_key", (key,)
+        )] or [k for (k,) in conn.execute(
+            "SELECT DISTINCT machine_key FROM machine_aliases WHERE instr(machine_key, ?) > 0 ORDER BY machine_key",
+            (key,),
+        )]
+        if keys:
+            return keys
+        aliases = self._nearest("machine_aliases", "SELECT DISTINCT alias FROM machine_aliases", key, 2)
+        if not aliases:
+            return []
+        print(f"🔎 No machine matches '{machine}', using the nearest: {', '.join(aliases)}")
+        return [k for (k,) in conn.execute(
+            f"SELECT DISTINCT machine_key FROM machine_aliases WHERE alias IN ({', '.join('?' * len(aliases))}) "
+            "ORDER BY machine_key",
+            aliases,
+        )]
+
+    def _machine_clause(self, machine: str, column: str = "machine_key") -> tuple:
+        """SQL condition and parameters restricting rows to the machines a name resolves to."""
+        keys = self.resolve_machine(machine)
+        return f"{column} IN ({', '.join('?' * len(keys))})", keys
+
+    def find_by_machine(self, tab: str, machine: str) -> list:
+        clause, keys = self._machine_clause(machine)
+        return self._rows(f"SELECT data FROM {tab} WHERE {clause} ORDER BY id", keys)
+
+    def find_by_machine_key(self, tab: str, machine_key: str) -> list:
+        """Rows of exactly one machine, by its normalized key (no alias resolution)."""
+        return self._rows(f"SELECT data FROM {tab} WHERE machine_key = ? ORDER BY id", (machine_key,))
+
+    def _find_by_code(self, tab: str, key_column: str, code: str, max_distance: int) -> list:
+        """
+        Exact match on the normalized code (E-352 == e352 == "E 352"), else prefix,
+        else substring, else the codes nearest to it within max_distance edits.
+        """
+        key = normalize_key(code)
+        if not key:
+            return []
+        results = self._rows(f"SELECT data FROM {tab} WHERE {key_column} = ? ORDER BY id", (key,))
+        results = results or self._prefix_then_substring(tab, key_column, key)
+        if results:
+            return results
+        nearest = self._nearest(key_column, f"SELECT DISTINCT {key_column} FROM {tab} WHERE {key_column} != ''",
+                                key, max_distance)
+        if not nearest:
+            return []
+        print(f"🔎 No code matches '{key}', using the nearest: {', '.join(nearest)}")
+        placeholders = ", ".join("?" * len(nearest))
+        return self._rows(f"SELECT data FROM {tab} WHERE {key_column} IN ({placeholders}) ORDER BY id", nearest)
+
+    def find_error_codes(self, error_code: str) -> list:
+        return self._find_by_code("error_codes", "code_key", error_code, 2)
+
+    def search_error_symptoms(self, symptom: str, limit: int, machine=None) -> list:
+        """
+        The `limit` error rows most similar to a symptom description, as (row, score)
+        pairs. The embedding index is built in memory once per mirrored version.
+        """
+        version, rows, machine_keys, index = self._symptoms
+        if index is None or version != self.mirrored_version():
+            version = self.mirrored_version()
+            rows = self._rows("SELECT data FROM error_codes ORDER BY id")
+            machine_keys = [normalize_key(row.get('machine', '')) for row in rows]
+            index = SymptomIndex([error_text(row) for row in rows])
+            self._symptoms = (version, rows, machine_keys, index)
+        positions = None
+        if machine:
+            wanted = set(self.resolve_machine(machine))
+            positions = [i for i, key in enumerate(machine_keys) if key in wanted]
+        return [(rows[i], score) for i, score in index.search(symptom, limit, positions)]
+
+    def find_parts_by_code(self, part_code: str) -> list:
+        # Part codes differ by one digit from their neighbours, so only a single edit counts as a typo
+        return self._find_by_code("spare_parts", "part_code_key", part_code, 1)
+
+    def _text_search(self, tab: str, fts: str, columns, term: str) -> list:
+        if len(term) >= 3:
+            phrase = '"' + term.replace('"', '""') + '"'
+            return self._rows(
+                f"SELECT t.data FROM {fts} JOIN {tab} t ON t.id = {fts}.rowid "
+                f"WHERE {fts} MATCH ? ORDER BY t.id",
+                (phrase,),
+            )
+        # The trigram tokenizer needs at least three characters
+        escaped = "%" + _like_escape(term) + "%"
+        where = " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in columns)
+        return self._rows(f"SELECT data FROM {tab} WHERE {where} ORDER BY id", (escaped,) * len(columns))
+
+    def _ranked_search(self, tab: str, fts: str, columns, term: str, limit: int) -> list:
+        """
+        The `limit` best (row, score) pairs by FTS5's BM25 over any of the
+        query's words (three characters or more), best first. A query without
+        such words falls back to the unranked substring search (score None).
+        """
+        words = [word for word in tokenize(term) if len(word) >= 3]
+        if not words:
+            return [(row, None) for row in self._text_search(tab, fts, columns, term)[:limit]]
+        match = " OR ".join(f'"{word}"' for word in words)
+        return [
+            (json.loads(data), -rank) for data, rank in self.connection().execute(
+                f"SELECT t.data, bm25({fts}) AS rank FROM {fts} JOIN {tab} t ON t.id = {fts}.rowid "
+                f"WHERE {fts} MATCH ? ORDER BY rank, t.id LIMIT ?",
+                (match, limit),
+            )
+        ]
+
+    def search_parts_text(self, search_term: str) -> list:
+        return self._text_search("spare_parts", "spare_parts_fts", ("name", "description"), search_term)
+
+    def search_maintenance_tasks(self, search_term: str) -> list:
+        return self._text_search("maintenance", "maintenance_fts", ("tasks",), search_term)
+
+    def rank_parts_text(self, search_term: str, limit: int) -> list:
+        return self._ranked_search("spare_parts", "spare_parts_fts", ("name", "description"), search_term, limit)
+
+    def rank_maintenance_tasks(self, search_term: str, limit: int) -> list:
+        return self._ranked_search("maintenance", "maintenance_fts", ("tasks",), search_term, limit)
+
+    def find_parts_by_availability(self, status: str, machine=None) -> list:
+        clause, keys = self._machine_clause(machine) if machine else ("1", [])
+        return self._rows(
+            f"SELECT data FROM spare_parts WHERE availability_status = ? AND {clause} ORDER BY id",
+            (status, *keys),
+        )
+
+    def find_parts_by_price(self, min_price=None, max_price=None, machine=None) -> list:
+        clause, keys = self._machine_clause(machine) if machine else ("1", [])
+        return self._rows(
+            "SELECT data FROM spare_parts WHERE price IS NOT NULL "
+            f"AND (? IS NULL OR price >= ?) AND (? IS NULL OR price <= ?) AND {clause} ORDER BY id",
+            (min_price, min_price, max_price, max_price, *keys),
+        )
+
+    def query_parts(self, machine=None, text=None, status=None, min_price=None, max_price=None,
+                    sort="relevance", limit=20, machine_key=None) -> list:
+        """
+        Spare parts matching every given filter as (row, score) pairs, in one
+        statement. Text matches any of its words through FTS5 and is scored by
+        bm25(); words shorter than three characters fall back to a substring
+        match without a score. Parts without a price sort last. machine_key
+        restricts to exactly one machine, where machine goes through resolve_machine.
+        """
+        where, params = [], []
+        if machine:
+            clause, keys = self._machine_clause(machine, "t.machine_key")
+            where.append(clause)
+            params += keys
+        if machine_key is not None:
+            where.append("t.machine_key = ?")
+            params.append(machine_key)
+        if status:
+            where.append("t.availability_status = ?")
+            params.append(status)
+        if min_price is not None:
+            where.append("t.price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            where.append("t.price <= ?")
+            params.append(max_price)
+        source, score = "spare_parts t", "NULL"
+        words = [word for word in tokenize(text or "") if len(word) >= 3]
+        if words:
+            source = "spare_parts_fts JOIN spare_parts t ON t.id = spare_parts_fts.rowid"
+            score = "-bm25(spare_parts_fts)"
+            where.append("spare_parts_fts MATCH ?")
+            params.append(" OR ".join(f'"{word}"' for word in words))
+        elif text:
+            where.append("(t.name LIKE ? ESCAPE '\\' OR t.description LIKE ? ESCAPE '\\')")
+            params += ["%" + _like_escape(text) + "%"] * 2
+        order = {
+            "price_asc": "t.price IS NULL, t.price, t.id",
+            "price_desc": "t.price IS NULL, t.price DESC, t.id",
+        }.get(sort, "score DESC, t.id" if words else "t.id")
+        sql = (f"SELECT t.data, {score} AS score FROM {source} "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order} LIMIT ?")
+        return [(json.loads(data), score) for data, score in self.connection().execute(sql, (*params, limit))]
+
+    def maintenance_due_between(self, start=None, end=None) -> list:
+        """Maintenance rows with start <= next_due <= end (ISO dates, either bound optional), earliest first."""
+        return self._rows(
+            "SELECT data FROM maintenance WHERE next_due IS NOT NULL "
+            "AND (? IS NULL OR next_due >= ?) AND (? IS NULL OR next_due <= ?) ORDER BY next_due, id",
+            (start, start, end, end),
+        )
+
+    def maintenance_sorted(self, descending: bool = False) -> list:
+        order = "DESC" if descending else "ASC"
+        return self._rows(
+            f"SELECT data FROM maintenance WHERE next_due IS NOT NULL ORDER BY next_due {order}, id"
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_sqlite_store(auto_sync: bool = True) -> SqliteStore:
+    """Return the process-wide mirror, syncing it from the snapshot the first time it is empty."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = SqliteStore()
+                if auto_sync and store.is_empty():
+                    print("⚠️ SQLite mirror is empty, syncing from the data source")
+                    sync_sqlite_mirror(store)
+                _store = store
+    return _store
+
+
+def sync_sqlite_mirror(store=None) -> dict:
+    """Sync job: load a fresh snapshot from the configured data source and mirror it into SQLite."""
+    from helper.snapshot import refresh_snapshot
+
+    snapshot = refresh_snapshot()
+    if not snapshot.tabs:
+        print("❌ Snapshot is empty, keeping the existing SQLite mirror")
+        return {}
+    if snapshot.stale:
+        print(f"❌ Data source is failing ({snapshot.stale_reason}), keeping the existing SQLite mirror")
+        return {}
+    return (store or get_sqlite_store(auto_sync=False)).sync(snapshot)
+
+
+def sync_if_changed(store=None) -> dict:
+    """
+    Mirror the data source's current snapshot if its version differs from the
+    mirrored one. Unlike sync_sqlite_mirror this never forces a reload: the
+    snapshot comes from the cache, which the data source's refresher keeps current.
+    """
+    from helper.snapshot import get_snapshot
+
+    store = store or get_sqlite_store(auto_sync=False)
+    snapshot = get_snapshot()
+    if not snapshot.tabs or snapshot.stale or snapshot.version == store.mirrored_version():
+        return {}
+    return store.sync(snapshot)
+
+
+_sync_thread = None
+_sync_stop = threading.Event()
+
+
+def start_mirror_sync(interval=SQLITE_SYNC_INTERVAL):
+    """
+    Start the data source's background refresher and a daemon thread that applies
+    each new snapshot to the mirror (a delta sync when it follows the mirrored one).
+    """
+    global _sync_thread
+    from helper.data_source import get_data_source
+
+    get_data_source().start_background_refresh()
+    with _store_lock:
+        if _sync_thread is not None and _sync_thread.is_alive():
+            return
+        _sync_stop.clear()
+        _sync_thread = threading.Thread(
+            target=_run_mirror_sync, args=(interval,), name="sqlite-mirror-sync", daemon=True
+        )
+        _sync_thread.start()
+    print(f"🔁 SQLite mirror sync started (every {interval:g}s)")
+
+
+def stop_mirror_sync():
+    _sync_stop.set()
+
+
+def _run_mirror_sync(interval):
+    while not _sync_stop.wait(interval):
+        try:
+            sync_if_changed()
+        except Exception as e:
+            print(f"❌ SQLite mirror sync error: {e}")
+
+
+if __name__ == "__main__":
+    # Run the sync job: python -m helper.sqlite_store
+    sync_sqlite_mirror()
@@ -25,6 +25,11 @@ except NameError:
 try:
     from langchain_core.messages import HumanMessage
     from graph.main_graph import supervisor_prebuilt
+    from helper.data_source import get_data_source
+    from helper.google_sheets import get_cache_stats
+    from helper.llm_cache import get_response_cache
+    from helper.snapshot import refresh_snapshot
+    from helper.sqlite_store import get_sqlite_store, start_mirror_sync, sync_sqlite_mirror, use_sqlite_backend
     print("✅ Successfully imported supervisor and LangChain components.")
 except ImportError as e:
     print(f"❌ Error importing supervisor: {e}")
@@ -66,6 +71,23 @@ class ChatResponse(BaseModel):
     thread_id: str
 
 
+# --- Prefetch sheet data at startup ---
+@app.on_event("startup")
+def prefetch_sheet_data():
+    """
+    Loads error codes, spare parts and maintenance tabs in one batch request before serving.
+    With the SQLite backend the local mirror is opened instead, only synced if it is empty,
+    and a background thread applies sheet edits to it as the snapshot changes.
+    Otherwise a background refresher keeps the snapshot loaded so requests never wait on Sheets.
+    """
+    if use_sqlite_backend():
+        get_sqlite_store()
+        start_mirror_sync()
+    else:
+        refresh_snapshot()
+        get_data_source().start_background_refresh()
+
+
 # --- API Endpoint for Chatting ---
 @app.post("/chat", response_model=ChatResponse)
 async def chat_with_agent(request: ChatRequest):
@@ -84,8 +106,10 @@ async def chat_with_agent(request: ChatRequest):
         
         print(f"🤖 Processing request for thread: {thread_id}...")
         
-        # Invoke the supervisor agent with the state and config
-        result = supervisor_prebuilt.invoke(state, config=config)
+        # Invoke the supervisor agent with the state and config.
+        # ainvoke keeps the event loop free: concurrent requests run their (sync) tools in
+        # worker threads, where simultaneous sheet cache misses share a single fetch.
+        result = await supervisor_prebuilt.ainvoke(state, config=config)
         
         # Extract the last message from the agent's response
         # The response is a list of messages, and we typically want the last one.
@@ -120,6 +144,34 @@ def read_root():
     return {"status": "ok", "message": "Welcome to the Technical Support Assistant API"}
 
 
+# --- Sheet Cache Statistics ---
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    Returns hit/miss counters of the Google Sheets snapshot cache, the
+    background refresher's last refresh time and last failure, the
+    state of the Sheets circuit breaker and the LLM response cache counters.
+    """
+    return {**get_cache_stats(), "llm": get_response_cache().stats()}
+
+
+# --- Sheet Data Refresh ---
+@app.post("/data/refresh")
+def refresh_sheet_data():
+    """
+    Reloads all sheet tabs in a single batch request and returns the new snapshot version.
+    """
+    if use_sqlite_backend():
+        return {"rows": sync_sqlite_mirror()}
+    snapshot = refresh_snapshot()
+    return {
+        "version": snapshot.version,
+        "stale": snapshot.stale,
+        "stale_reason": snapshot.stale_reason,
+        "rows": {name: len(rows) for name, rows in snapshot.tabs.items()},
+    }
+
+
 # --- How to run the server ---
 # To run this FastAPI application, save the code as `api.py` and run the following command in your terminal:
 # uvicorn api:app --reload
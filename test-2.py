@@ -8,14 +8,11 @@ import uuid
 
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import Runnable
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langchain.tools import tool
@@ -25,12 +22,15 @@ from langgraph.graph.message import add_messages
 from langchain.chat_models import init_chat_model
 from dotenv import load_dotenv
 
+from helper.data_source import get_data_source
+from helper.llm import get_llm
+from helper.snapshot import get_snapshot
+
 load_dotenv()
 
 # Use environment variables with fallbacks (remove hardcoded keys)
+# Sheet data is read through helper.data_source (GOOGLE_SHEETS_API_KEY / GOOGLE_SHEET_ID or DATA_SOURCE)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GOOGLE_SHEETS_API_KEY = os.getenv("GOOGLE_SHEETS_API_KEY")
-GOOGLE_SHEET_ID = os.getenv("GOOGLE_SHEET_ID")
 
 os.environ["GOOGLE_API_KEY"] = GEMINI_API_KEY
 
@@ -41,32 +41,6 @@ class GraphState(TypedDict):
     tool_outputs: Optional[list]
     generation: Optional[str]
 
-def query_google_sheets(sheet_name: str, range_name: str = "A:Z") -> list:
-    """Query data from a specific sheet in Google Sheets."""
-    try:
-        service = build('sheets', 'v4', developerKey=GOOGLE_SHEETS_API_KEY)
-        sheet = service.spreadsheets()
-        result = sheet.values().get(
-            spreadsheetId=GOOGLE_SHEET_ID,
-            range=f"{sheet_name}!{range_name}"
-        ).execute()
-        
-        values = result.get('values', [])
-        if not values or len(values) < 2:
-            print(f"⚠️ No data or only headers found in sheet: {sheet_name}")
-            return []
-
-        headers = values[0]
-        data = [dict(zip(headers, row + [''] * (len(headers) - len(row)))) for row in values[1:]]
-        print(f"✅ Successfully parsed {len(data)} rows from {sheet_name}")
-        return data
-    except HttpError as e:
-        print(f"❌ HTTP Error querying sheet {sheet_name}: {e}")
-        return []
-    except Exception as e:
-        print(f"❌ Unexpected error querying sheet {sheet_name}: {e}")
-        return []
-    
 class ErrorSearchArgs(BaseModel):
     machine: Optional[str] = Field(description="The name of the machine, e.g., MASTERFOLD, NOVACUT.")
     error_code: str = Field(description="The error code to look up, e.g., E-352, ERR-123.")
@@ -74,7 +48,7 @@ class ErrorSearchArgs(BaseModel):
 @tool(args_schema=ErrorSearchArgs)
 def search_error_codes(machine: Optional[str], error_code: str) -> list:
     """Searches the 'error_codes' sheet for information about a specific error on a machine."""
-    data = query_google_sheets("error_codes")
+    data = get_snapshot().rows("error_codes")
     results = [
         row for row in data 
         if (not machine or machine.upper() in row.get('machine', '').upper()) and \
@@ -91,7 +65,7 @@ class PartSearchArgs(BaseModel):
 @tool(args_schema=PartSearchArgs)
 def search_spare_parts(machine: Optional[str], part_name: Optional[str], keywords: Optional[List[str]]) -> list:
     """Searches the 'spare_parts' sheet for available parts based on name, code, or keywords."""
-    data = query_google_sheets("spare_parts")
+    data = get_snapshot().rows("spare_parts")
     results = []
     for row in data:
         match_machine = not machine or machine.upper() in row.get('machine', '').upper()
@@ -112,7 +86,7 @@ class MaintenanceSearchArgs(BaseModel):
 @tool(args_schema=MaintenanceSearchArgs)
 def search_maintenance_info(machine: str) -> list:
     """Searches the 'maintenance' sheet for procedures and schedules for a specific machine."""
-    data = query_google_sheets("maintenance")
+    data = get_snapshot().rows("maintenance")
     results = [
         row for row in data
         if machine.upper() in row.get('machine', '').upper()
@@ -139,14 +113,10 @@ def extract_entities_node(state: GraphState) -> dict:
     ])
     
     try:
-        # Try different initialization methods for compatibility
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro", 
-            temperature=0.1,
-            google_api_key=GEMINI_API_KEY
-        )
+        # Shared client, created once for the process (not per request)
+        llm = get_llm("routing")
     except Exception as e:
-        print(f"Error initializing ChatGoogleGenerativeAI: {e}")
+        print(f"Error initializing the routing LLM: {e}")
         # Fallback to a simple rule-based entity extraction
         user_message = state["messages"][-1].content.lower()
         
@@ -267,12 +237,8 @@ def generate_response_node(state: GraphState) -> dict:
             """
         )
         
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro", 
-            temperature=0.1,
-            google_api_key=GEMINI_API_KEY
-        )
-        chain = prompt | llm
+        # Shared client, created once for the process (not per request)
+        chain = prompt | get_llm("synthesis")
         
         response = chain.invoke({
             "user_message": user_message,
@@ -512,6 +478,8 @@ if __name__ == '__main__':
         print("=" * 60)
         print("✅ Configuration loaded.")
         print("✅ LangGraph compiled with memory.")
+        # Keep sheet data loaded in the background so requests never wait on Sheets
+        get_data_source().start_background_refresh()
         print("\n🌐 Server starting at: http://127.0.0.1:5000")
         print("=" * 60)
         app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import sys
+import threading
+import urllib.parse
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper import data_source, google_sheets
+from helper.circuit_breaker import CircuitBreaker
+from helper.sheet_cache import SheetCache
+from helper.sheets_client import SheetsClientPool
+from helper.snapshot import build_snapshot
+from helper.sqlite_store import SqliteStore
+
+SPREADSHEET_ID = "test-sheet"
+
+
+def _column(letters: str) -> int:
+    """A -> 0, Z -> 25, AA -> 26."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+class SheetsStandIn:
+    """
+    Local HTTP stand-in for the Sheets v4 endpoints the client calls: values.get,
+    values.batchGet and spreadsheets.get (grid row counts). Like the real API,
+    trailing empty cells and trailing empty rows are left out of each range.
+    """
+
+    def __init__(self, tabs: dict):
+        self.tabs = tabs
+        self.requests = []
+        self.failures = 0       # answer the next N requests with a 503
+        self.empty_grid_rows = 20   # empty rows below the data, counted in the grid size
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def value_range(self, range_name: str) -> dict:
+        tab, _, cells = range_name.partition("!")
+        rows = self.tabs[tab.strip("'")]
+        match = re.fullmatch(r"([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?", cells or "A:Z")
+        first_col, first_row, last_col, last_row = match.groups()
+        first_col = _column(first_col) if first_col else 0
+        last_col = _column(last_col) if last_col else 25
+        first_row = int(first_row) - 1 if first_row else 0
+        last_row = int(last_row) if last_row else len(rows)
+
+        values = []
+        for row in rows[first_row:last_row]:
+            cells = list(row[first_col:last_col + 1])
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        result = {"range": range_name, "majorDimension": "ROWS"}
+        if values:
+            result["values"] = values
+        return result
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                stand_in.requests.append(self.path)
+                if stand_in.failures:
+                    stand_in.failures -= 1
+                    return self._send(503, {"error": {"code": 503, "message": "unavailable"}})
+                if url.path.endswith("/values:batchGet"):
+                    return self._send(200, {"valueRanges": [stand_in.value_range(r) for r in query["ranges"]]})
+                match = re.match(r"/v4/spreadsheets/[^/]+/values/(.+)", url.path)
+                if match:
+                    return self._send(200, stand_in.value_range(urllib.parse.unquote(match.group(1))))
+                if re.fullmatch(r"/v4/spreadsheets/[^/]+", url.path):
+                    return self._send(200, {"sheets": [
+                        {"properties": {"title": name, "gridProperties": {"rowCount": len(rows) + stand_in.empty_grid_rows}}}
+                        for name, rows in stand_in.tabs.items()
+                    ]})
+                self._send(404, {"error": {"code": 404, "message": "not found"}})
+
+            def _send(self, status, body):
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+        return Handler
+
+
+TABS = {
+    "error_codes": [
+        ["machine", "code", "description", "solution"],
+        ["MASTERFOLD", "E-352", "Conveyor speed misalignment", "Check belt tension and sensor alignment"],
+        ["NOVACUT", "ERR-123", "Blade alignment error", "Calibrate cutting blade position"],
+    ],
+    "spare_parts": [
+        ["machine", "part_code", "name", "description", "price", "availability"],
+        ["MASTERFOLD", "MF-00234", "Feeder Assembly", "Replacement feeder kit", "₹8,500", "In Stock"],
+        ["NOVACUT", "NC-00123", "Cutting Blade", "Precision cutting blade", "₹15,750", "In Stock"],
+    ],
+    "maintenance": [["machine", "next_due", "tasks"]] + [
+        [f"MACHINE-{i}", f"2025-08-{i + 1:02d}", f"Task {i}"] for i in range(12)
+    ],
+}
+
+
+@pytest.fixture
+def sheets(monkeypatch):
+    """A Sheets stand-in holding a copy of TABS, with the client, cache and breaker pointed at it."""
+    stand_in = SheetsStandIn({name: [list(row) for row in rows] for name, rows in TABS.items()})
+    pool = SheetsClientPool("test-key", api_endpoint=stand_in.url)
+    monkeypatch.setattr(google_sheets, "GOOGLE_SHEETS_API_KEY", "test-key")
+    monkeypatch.setattr(google_sheets, "sheets_pool", pool)
+    cache = SheetCache()
+    breaker = CircuitBreaker("Google Sheets", is_failure=google_sheets.is_transient_error)
+    for module in (google_sheets, data_source):
+        monkeypatch.setattr(module, "GOOGLE_SHEET_ID", SPREADSHEET_ID)
+        monkeypatch.setattr(module, "sheets_cache", cache)
+        monkeypatch.setattr(module, "sheets_breaker", breaker)
+    yield stand_in
+    pool.close()
+    stand_in.close()
+
+
+@pytest.fixture
+def snapshot():
+    """A snapshot of TABS plus a BOBST-SP102 machine and MASTERFOLD tasks around today."""
+    tabs = {name: [list(row) for row in rows] for name, rows in TABS.items()}
+    today = date.today()
+    tabs["error_codes"].append(["BOBST-SP102", "SYS-001", "System startup failure", "Power cycle and check connections"])
+    tabs["spare_parts"] += [
+        ["BOBST-SP102", "SP-201", "Control Board", "Main control board", "₹42,500", "Out of Stock"],
+        ["MASTERFOLD", "MF-00156", "Sensor Calibration Tool", "Aligns the conveyor sensor", "₹3,200", "In Stock"],
+        ["MASTERFOLD", "MF-00310", "Drive Belt", "Conveyor drive belt", "₹1,900", "3-5 days"],
+    ]
+    tabs["maintenance"] += [
+        ["BOBST-SP102", "2025-09-10", "System diagnostic, Replace filters"],
+        ["MASTERFOLD", (today - timedelta(days=3)).isoformat(), "Check belt tension"],
+        ["MASTERFOLD", (today + timedelta(days=10)).isoformat(), "Lubricate folding mechanisms"],
+        ["MASTERFOLD", (today + timedelta(days=90)).isoformat(), "Replace rollers"],
+    ]
+    return build_snapshot(tabs)
+
+
+@pytest.fixture
+def store(snapshot, tmp_path):
+    """A SQLite mirror of the snapshot fixture."""
+    store = SqliteStore(str(tmp_path / "mirror.db"))
+    store.sync(snapshot)
+    return store
@@ -0,0 +1,48 @@
+import pytest
+
+from helper import data_source, google_sheets, sqlite_store
+from helper import snapshot as snapshot_module
+from tools.error_code import search_by_error_code
+
+
+def _open_circuit():
+    def fail():
+        raise OSError("connection reset")
+
+    for _ in range(google_sheets.sheets_breaker.failure_threshold):
+        with pytest.raises(OSError):
+            google_sheets.sheets_breaker.call(fail)
+
+
+def test_snapshot_is_stale_while_circuit_is_open(sheets):
+    source = data_source.SheetsDataSource()
+    snapshot = source.get_snapshot()
+    assert not snapshot.stale
+
+    _open_circuit()
+    stale = source.get_snapshot()
+    assert stale.stale and "circuit is open" in stale.stale_reason
+    assert stale.version == snapshot.version
+
+
+def test_tool_results_carry_the_stale_flag(sheets, monkeypatch):
+    monkeypatch.setattr(data_source, "_data_source", data_source.SheetsDataSource())
+    result = search_by_error_code.invoke({"error_code": "E-352"})
+    assert result["total"] == 1 and "stale" not in result
+
+    _open_circuit()
+    result = search_by_error_code.invoke({"error_code": "E-352"})
+    assert result["total"] == 1
+    assert result["stale"] is True and "circuit is open" in result["stale_reason"]
+
+
+def test_sqlite_results_carry_the_mirror_version_instead(snapshot, store, monkeypatch):
+    def no_snapshot():
+        raise AssertionError("the SQLite backend must not load the snapshot")
+
+    monkeypatch.setattr(sqlite_store, "TOOLS_BACKEND", "sqlite")
+    monkeypatch.setattr(sqlite_store, "_store", store)
+    monkeypatch.setattr(snapshot_module, "get_snapshot", no_snapshot)
+    result = search_by_error_code.invoke({"error_code": "E-352"})
+    assert result["total"] == 1 and "stale" not in result
+    assert result["data_version"] == snapshot.version and result["synced_at"]
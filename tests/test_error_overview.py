@@ -0,0 +1,54 @@
+from datetime import date
+
+import pytest
+
+from tools import error_code
+
+
+def _overviews(monkeypatch, snapshot, store, code, machine, max_parts=5):
+    monkeypatch.setattr(error_code, "get_snapshot", lambda: snapshot)
+    monkeypatch.setattr(error_code, "get_sqlite_store", lambda: store)
+    today = date.today().toordinal()
+    args = (code, machine, today, today + 30, max_parts)
+    return error_code._snapshot_overview(*args), error_code._sqlite_overview(*args)
+
+
+@pytest.mark.parametrize("code, machine", [
+    ("E-352", None), ("E-352", "masterfold"), ("E-352", "NOVACUT"), ("SYS-001", "bobst sp-102"), ("ERR-123", "cut"),
+])
+def test_both_backends_give_the_same_overview(monkeypatch, snapshot, store, code, machine):
+    (errors, parts, overdue, upcoming), (sql_errors, sql_parts, sql_overdue, sql_upcoming) = _overviews(
+        monkeypatch, snapshot, store, code, machine
+    )
+    assert sql_errors == errors
+    assert [(p["for_code"], p["part_code"]) for p in sql_parts] == [(p["for_code"], p["part_code"]) for p in parts]
+    assert sql_overdue == overdue
+    assert sql_upcoming == upcoming
+
+
+def test_parts_related_to_the_error_come_first_without_duplicates(monkeypatch, snapshot, store):
+    for errors, parts, overdue, upcoming in _overviews(monkeypatch, snapshot, store, "E-352", None):
+        codes = [p["part_code"] for p in parts]
+        assert len(codes) == len(set(codes)) == 3
+        assert codes[-1] == "MF-00234" and parts[-1]["score"] is None
+        assert [task["tasks"] for task in overdue] == ["Check belt tension"]
+        assert [task["tasks"] for task in upcoming] == ["Lubricate folding mechanisms"]
+
+
+def test_each_overview_section_pages_with_its_own_cursor(monkeypatch, snapshot):
+    monkeypatch.setattr(error_code, "get_snapshot", lambda: snapshot)
+    monkeypatch.setattr(error_code, "staleness", lambda: {})
+    # A budget of one row per section
+    monkeypatch.setattr(error_code, "TOOL_TOKEN_BUDGET", 40)
+    args = {"error_code": "E-352", "days_ahead": 120}
+    first = error_code.get_error_overview.invoke(args)
+    assert first["parts"]["total"] == 3 and len(first["parts"]["rows"]) == 1
+    assert "parts_cursor='1'" in first["parts"]["note"]
+    assert "upcoming_cursor='1'" in first["upcoming_maintenance"]["note"]
+
+    second = error_code.get_error_overview.invoke({**args, "parts_cursor": first["parts"]["next_cursor"],
+                                                   "upcoming_cursor": first["upcoming_maintenance"]["next_cursor"]})
+    assert second["parts"]["rows"] != first["parts"]["rows"] and second["parts"]["next_cursor"] == "2"
+    assert second["upcoming_maintenance"]["rows"] != first["upcoming_maintenance"]["rows"]
+    assert "next_cursor" not in second["upcoming_maintenance"]
+    assert second["error"] == first["error"]
@@ -0,0 +1,55 @@
+from helper import google_sheets
+from helper.sheet_cache import SheetCache
+from helper.snapshot import build_snapshot
+
+
+def test_query_google_sheets_fetches_and_caches(sheets):
+    rows = google_sheets.query_google_sheets("error_codes")
+    assert [row["code"] for row in rows] == ["E-352", "ERR-123"]
+
+    google_sheets.query_google_sheets("error_codes")
+    assert len(sheets.requests) == 1
+
+
+def test_fetch_sheets_batch_uses_one_request(sheets):
+    tabs = google_sheets.fetch_sheets_batch(["error_codes", "spare_parts"])
+    assert [row["part_code"] for row in tabs["spare_parts"]] == ["MF-00234", "NC-00123"]
+    assert tabs["error_codes"][1]["machine"] == "NOVACUT"
+    assert len(sheets.requests) == 1
+
+
+def test_transient_errors_fall_back_to_last_good_rows(sheets, monkeypatch):
+    monkeypatch.setattr(google_sheets, "sheets_cache", SheetCache(ttl=0, stale_ttl=0))
+    first = google_sheets.query_google_sheets("error_codes")
+    sheets.failures = 1
+    assert google_sheets.query_google_sheets("error_codes") == first
+    assert len(sheets.requests) == 2
+
+
+def test_streaming_reads_every_chunk(sheets):
+    values = google_sheets.stream_sheets_values(["maintenance"], {"maintenance": ("machine", "next_due")}, chunk_rows=5)
+    header, *rows = list(values["maintenance"])
+    assert header == ["machine", "next_due"]
+    assert rows == [[f"MACHINE-{i}", f"2025-08-{i + 1:02d}"] for i in range(12)]
+
+
+def test_streamed_snapshot_matches_plain_fetch(sheets):
+    plain = google_sheets.fetch_sheets_batch(["maintenance"])["maintenance"]
+    snapshot = build_snapshot(google_sheets.stream_sheets_values(["maintenance"], chunk_rows=5))
+    assert snapshot.rows("maintenance") == plain
+
+
+def test_streaming_reads_past_a_blank_row_at_a_chunk_boundary(sheets):
+    # Sheet row 6 ends the first chunk of 5 and row 11 the second; the API trims both chunks short
+    sheets.tabs["maintenance"][5] = ['', '', '']
+    sheets.tabs["maintenance"][10] = ['', '', 'Task only']
+    plain = google_sheets.fetch_sheets_batch(["maintenance"])["maintenance"]
+    assert len(plain) == 12
+
+    snapshot = build_snapshot(google_sheets.stream_sheets_values(["maintenance"], chunk_rows=5))
+    assert snapshot.rows("maintenance") == plain
+
+    values = google_sheets.stream_sheets_values(["maintenance"], {"maintenance": ("machine", "next_due")}, chunk_rows=5)
+    header, *rows = list(values["maintenance"])
+    assert len(rows) == 12
+    assert rows[4] == rows[9] == ['', ''] and rows[-1] == ["MACHINE-11", "2025-08-12"]
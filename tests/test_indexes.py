@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from helper.indexes import SymptomIndex
+
+TEXTS = ["Conveyor speed misalignment", "", "Blade alignment error, calibrate cutting blade", "Feeder jam detected"]
+
+
+@pytest.mark.parametrize("texts", [TEXTS, TEXTS + ["", ""], [""] + TEXTS + [""]])
+def test_a_text_matches_itself_exactly(texts):
+    index = SymptomIndex(texts)
+    for position, text in enumerate(texts):
+        if text:
+            best, score = index.search(text, 1)[0]
+            assert best == position and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_row_sums_match_a_dense_sum():
+    texts = TEXTS + ["", ""]
+    index = SymptomIndex(texts)
+    values = np.arange(len(index._feature_rows), dtype=np.float64) + 1
+    expected = [values[index._feature_rows == row].sum() for row in range(len(texts))]
+    assert index._row_sums(values).tolist() == expected
+
+
+def test_empty_index_finds_nothing():
+    assert SymptomIndex([]).search("conveyor") == []
+    assert SymptomIndex(["", ""]).search("conveyor") == []
@@ -0,0 +1,54 @@
+import pytest
+
+langchain_google_genai = pytest.importorskip("langchain_google_genai")
+
+from helper import llm
+
+
+class RecordingModel:
+    """Stands in for ChatGoogleGenerativeAI and records the settings it was built with."""
+    created = []
+
+    def __init__(self, **settings):
+        self.settings = settings
+        RecordingModel.created.append(self)
+
+
+@pytest.fixture
+def models(monkeypatch):
+    RecordingModel.created = []
+    monkeypatch.setattr(langchain_google_genai, "ChatGoogleGenerativeAI", RecordingModel)
+    monkeypatch.setattr(llm, "_clients", {})
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    for role in llm.LLM_ROLES:
+        monkeypatch.delenv(f"LLM_{role.upper()}_MODEL", raising=False)
+        monkeypatch.delenv(f"LLM_{role.upper()}_TEMPERATURE", raising=False)
+    return RecordingModel.created
+
+
+def test_roles_with_the_same_settings_share_one_client(models):
+    client = llm.get_llm("routing")
+    assert llm.get_llm("routing") is client
+    assert llm.get_llm("tool_use") is client and llm.get_llm("synthesis") is client
+    assert len(models) == 1
+    assert models[0].settings["model"] == llm.LLM_MODEL and models[0].settings["google_api_key"] == "test-key"
+
+
+def test_a_role_override_gets_its_own_cached_client(models, monkeypatch):
+    monkeypatch.setenv("LLM_ROUTING_MODEL", "gemini-1.5-flash")
+    monkeypatch.setenv("LLM_SYNTHESIS_TEMPERATURE", "0.7")
+    routing, tool_use, synthesis = (llm.get_llm(role) for role in llm.LLM_ROLES)
+    assert len({id(routing), id(tool_use), id(synthesis)}) == 3
+    assert routing.settings["model"] == "gemini-1.5-flash"
+    assert synthesis.settings["temperature"] == 0.7
+    assert llm.get_llm("synthesis") is synthesis and len(models) == 3
+
+
+def test_unknown_roles_and_a_missing_key_are_rejected(models, monkeypatch):
+    with pytest.raises(ValueError):
+        llm.get_llm("summarize")
+    monkeypatch.delenv("GOOGLE_API_KEY")
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        llm.get_llm("routing")
+    assert not models
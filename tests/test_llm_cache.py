@@ -0,0 +1,83 @@
+import pytest
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration
+
+from helper import llm_cache
+from helper.llm_cache import LangChainResponseCache, ResponseCache, cached_completion
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def data_version(monkeypatch):
+    version = ["v1"]
+    monkeypatch.setattr(llm_cache, "current_data_version", lambda: version[0])
+    monkeypatch.setattr(llm_cache, "_response_cache", ResponseCache(path=""))
+    return version
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ResponseCache(max_size=2, path="")
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"     # b is now the least recently used
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=60, path="")
+    cache.put("a", "1")
+    clock[0] += 59
+    assert cache.get("a") == "1"
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0 and cache.misses == 1
+
+
+def test_the_disk_tier_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / "llm_cache.db")
+    ResponseCache(ttl=60, path=path).put("a", "1")
+
+    restarted = ResponseCache(ttl=60, path=path)
+    assert restarted.get("a") == "1" and restarted.disk_hits == 1
+    assert restarted.get("a") == "1" and restarted.hits == 1    # promoted to memory
+
+    clock[0] += 61
+    assert ResponseCache(ttl=60, path=path).get("a") is None
+
+
+def test_a_data_version_change_misses_the_cache(data_version):
+    calls = []
+
+    def generate(prompt):
+        calls.append(prompt)
+        return f"answer {len(calls)}"
+
+    assert cached_completion("model", "What is E-352?", generate) == "answer 1"
+    assert cached_completion("model", "what is   e-352?", generate) == "answer 1"
+    data_version[0] = "v2"
+    assert cached_completion("model", "What is E-352?", generate) == "answer 2"
+    assert len(calls) == 2
+
+
+def test_chat_cache_keys_follow_the_data_version(data_version):
+    cache = LangChainResponseCache(llm_cache.get_response_cache())
+    prompt = dumps([HumanMessage(content="Parts for MASTERFOLD?")])
+    answer = AIMessage(content="", tool_calls=[{"name": "search_parts_by_machine", "args": {"machine": "MASTERFOLD"},
+                                                 "id": "call-1"}])
+    cache.update(prompt, "gemini", [ChatGeneration(message=answer)])
+
+    cached = cache.lookup(prompt, "gemini")
+    assert cached[0].message.tool_calls[0]["args"] == {"machine": "MASTERFOLD"}
+    assert cached[0].message.tool_calls[0]["id"] != "call-1"
+    data_version[0] = "v2"
+    assert cache.lookup(prompt, "gemini") is None
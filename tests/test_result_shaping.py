@@ -0,0 +1,81 @@
+import pytest
+
+from helper import result_shaping
+from helper.result_shaping import estimate_tokens, shape_results, shaped
+
+ROWS = [{"part_code": f"P-{i:03d}", "name": f"Part {i}", "price": f"₹{100 + i}"} for i in range(10)]
+
+
+@pytest.fixture(autouse=True)
+def fresh_data(monkeypatch):
+    monkeypatch.setattr(result_shaping, "staleness", lambda: {})
+
+
+def test_fields_keep_only_the_requested_columns():
+    result = shape_results(ROWS, fields=["price", "part_code"])
+    assert result["columns"] == ["part_code", "price"]
+    assert result["rows"][0] == ["P-000", "₹100"]
+    # Unknown fields fall back to every column rather than an empty table
+    assert shape_results(ROWS, fields=["colour"])["columns"] == ["part_code", "name", "price"]
+
+
+def test_max_rows_leaves_a_cursor_for_the_rest():
+    result = shape_results(ROWS, max_rows=3)
+    assert [row[0] for row in result["rows"]] == ["P-000", "P-001", "P-002"]
+    assert result["total"] == 10 and result["next_cursor"] == "3"
+    assert "cursor='3'" in result["note"]
+    assert "next_cursor" not in shape_results(ROWS, max_rows=10)
+
+
+def test_cursor_round_trip_returns_every_row_once():
+    seen, cursor = [], None
+    while True:
+        result = shape_results(ROWS, max_rows=4, cursor=cursor)
+        seen += [row[0] for row in result["rows"]]
+        cursor = result.get("next_cursor")
+        if cursor is None:
+            break
+    assert seen == [row["part_code"] for row in ROWS]
+
+
+def test_invalid_cursor_starts_over():
+    assert shape_results(ROWS, cursor="abc")["rows"][0][0] == "P-000"
+
+
+def test_token_budget_cuts_rows_but_returns_at_least_one():
+    result = shape_results(ROWS, token_budget=60)
+    assert 0 < len(result["rows"]) < len(ROWS)
+    assert estimate_tokens(result) <= 60 + 20
+    assert result["next_cursor"] == str(len(result["rows"]))
+
+    huge = [{"description": "x" * 5000}]
+    result = shape_results(huge, token_budget=10)
+    assert len(result["rows"]) == 1 and "next_cursor" not in result
+    assert len(result["rows"][0][0]) == result_shaping.TOOL_MAX_CELL_CHARS
+
+
+def test_shaped_tools_take_the_shaping_args():
+    @shaped
+    def parts() -> list:
+        return ROWS
+
+    result = parts(fields=["part_code"], max_rows=2, cursor="4")
+    assert result == {
+        "columns": ["part_code"], "rows": [["P-004"], ["P-005"]], "total": 10, "next_cursor": "6",
+        "note": "Showing rows 5-6 of 10. Call again with cursor='6' for more, or narrow the query.",
+    }
+
+
+def test_shaped_batch_tools_pass_their_extras_through():
+    @shaped
+    def parts_by_codes(codes):
+        rows, not_found = result_shaping.grouped_rows(
+            codes, lambda code: [row for row in ROWS if row["part_code"] == code]
+        )
+        return rows, {"not_found": not_found} if not_found else None
+
+    result = parts_by_codes(["P-001", "P-999", "P-001", "P-002"], fields=["price"])
+    assert result["columns"] == ["query", "price"]
+    assert result["rows"] == [["P-001", "₹101"], ["P-002", "₹102"]]
+    assert result["not_found"] == ["P-999"]
+    assert "not_found" not in parts_by_codes(["P-001"])
@@ -0,0 +1,186 @@
+import threading
+import time
+import types
+
+import pytest
+
+from helper import sheet_cache
+from helper.sheet_cache import SheetCache
+
+KEY = ("sheet-1", "error_codes", "A:Z")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock the tests move by hand (threading keeps the real one)."""
+    fake = types.SimpleNamespace(now=100.0)
+    fake.monotonic = lambda: fake.now
+    monkeypatch.setattr(sheet_cache, "time", fake)
+    return fake
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"rows v{self.calls}"
+
+
+class Revisions:
+    def __init__(self):
+        self.revisions = {}
+        self.polls = 0
+
+    def __call__(self, spreadsheet_id):
+        self.polls += 1
+        return self.revisions.get(spreadsheet_id, 1)
+
+
+def test_entries_are_served_from_memory_until_the_ttl_runs_out(clock):
+    cache, load = SheetCache(ttl=60, stale_ttl=0), Loader()
+    assert cache.get_or_load(KEY, load) == "rows v1"
+    clock.now += 59
+    assert cache.get_or_load(KEY, load) == "rows v1"
+    assert load.calls == 1 and cache.hits == 1
+
+    clock.now += 2
+    assert cache.get_or_load(KEY, load) == "rows v2"
+    assert load.calls == 2 and cache.misses == 2
+
+
+def test_an_unchanged_revision_renews_expired_entries_without_a_reload(clock):
+    revisions, load = Revisions(), Loader()
+    cache = SheetCache(ttl=60, revision_fn=revisions, revision_check_interval=30)
+    cache.get_or_load(KEY, load)
+    clock.now += 61
+    cache.refresh_expiring(ahead=0)
+    assert load.calls == 1 and cache.revalidations == 1
+    assert cache.get_or_load(KEY, load) == "rows v1" and cache.hits == 1
+
+
+def test_a_changed_revision_expires_the_spreadsheet(clock):
+    revisions, load = Revisions(), Loader()
+    cache = SheetCache(ttl=600, revision_fn=revisions, revision_check_interval=30)
+    other = ("sheet-2", "error_codes", "A:Z")
+    cache.get_or_load(KEY, load)
+    cache.get_or_load(other, lambda: "other rows")
+
+    revisions.revisions[KEY[0]] = 2
+    clock.now += 31
+    cache.refresh_expiring(ahead=0)
+    assert load.calls == 2 and cache.refreshes == 1
+    assert cache.get_or_load(KEY, load) == "rows v2"
+    assert cache.get_or_load(other, lambda: "reloaded") == "other rows"
+
+
+def test_revisions_are_polled_at_most_once_per_interval(clock):
+    revisions, load = Revisions(), Loader()
+    cache = SheetCache(ttl=600, revision_fn=revisions, revision_check_interval=30)
+    cache.get_or_load(KEY, load)
+    for _ in range(5):
+        clock.now += 5
+        cache.refresh_expiring(ahead=0)
+    assert revisions.polls == 1
+    clock.now += 10
+    cache.refresh_expiring(ahead=0)
+    assert revisions.polls == 2
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_expired_entries_are_served_stale_while_reloading(clock):
+    cache, load, release = SheetCache(ttl=60, stale_ttl=600), Loader(), threading.Event()
+
+    def slow_load():
+        if load.calls:
+            release.wait(5)
+        return load()
+
+    cache.get_or_load(KEY, slow_load)
+    clock.now += 61
+    # Returns at once although the reload is blocked, and only one reload starts
+    assert cache.get_or_load(KEY, slow_load) == "rows v1"
+    assert cache.get_or_load(KEY, slow_load) == "rows v1"
+    assert cache.stale_hits == 2
+    release.set()
+    _wait_for(lambda: cache.refreshes == 1)
+    assert cache.get_or_load(KEY, slow_load) == "rows v2" and load.calls == 2
+
+
+def test_a_failed_reload_keeps_the_last_good_value(clock):
+    cache, load = SheetCache(ttl=60, stale_ttl=600), Loader()
+    cache.get_or_load(KEY, load)
+
+    def failing_load():
+        raise OSError("connection reset")
+
+    cache._entries[KEY].loader = failing_load
+    clock.now += 61
+    assert cache.get_or_load(KEY, load) == "rows v1"
+    _wait_for(lambda: cache.refresh_failures == 1)
+    assert "connection reset" in cache.last_refresh_error
+    # Not retried before SHEETS_REFRESH_RETRY seconds
+    assert cache.get_or_load(KEY, load) == "rows v1"
+    assert not cache._refreshing and cache.refresh_failures == 1
+
+
+def test_entries_past_the_stale_window_are_reloaded_inline(clock):
+    cache, load = SheetCache(ttl=60, stale_ttl=600), Loader()
+    cache.get_or_load(KEY, load)
+    clock.now += 661
+    assert cache.get_or_load(KEY, load) == "rows v2"
+    assert cache.stale_hits == 0 and cache.misses == 2
+
+
+def _concurrent_misses(cache, loader, count=8):
+    results = [None] * count
+
+    def read(i):
+        try:
+            results[i] = cache.get_or_load(KEY, loader)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_misses_share_one_load():
+    cache, load, release = SheetCache(), Loader(), threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        return load()
+
+    threads, results = _concurrent_misses(cache, slow_load)
+    _wait_for(lambda: cache.coalesced == len(threads) - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert load.calls == 1 and results == ["rows v1"] * len(threads)
+    assert not cache._inflight
+
+
+def test_a_failed_shared_load_raises_in_every_waiter_and_is_retried():
+    cache, release = SheetCache(), threading.Event()
+
+    def failing_load():
+        release.wait(5)
+        raise OSError("connection reset")
+
+    threads, results = _concurrent_misses(cache, failing_load)
+    _wait_for(lambda: cache.coalesced == len(threads) - 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert all(isinstance(result, OSError) for result in results)
+    assert cache.get_or_load(KEY, lambda: "rows") == "rows"
@@ -0,0 +1,97 @@
+import pytest
+
+from helper.snapshot import build_snapshot
+from helper.sqlite_store import MIRROR_TABS, SqliteStore
+
+
+def _values(snapshot) -> dict:
+    return {name: [list(snapshot.headers[name])] + [[row[h] for h in snapshot.headers[name]] for row in rows]
+            for name, rows in snapshot.tabs.items()}
+
+
+def _edit(snapshot) -> dict:
+    """Sheet values with a part added, a part's price changed, an error code removed and two tasks swapped."""
+    values = _values(snapshot)
+    values["spare_parts"].append(["NOVACUT", "NC-00999", "Blade Guard", "Guard for the cutting blade", "₹2,100", "In Stock"])
+    changed = next(row for row in values["spare_parts"] if row[1] == "MF-00156")
+    changed[4] = "₹3,900"
+    values["error_codes"] = [row for row in values["error_codes"] if row[1] != "ERR-123"]
+    values["maintenance"][1], values["maintenance"][2] = values["maintenance"][2], values["maintenance"][1]
+    return values
+
+
+@pytest.fixture
+def edited(snapshot):
+    """The edited sheet values, built both from the snapshot fixture (diffed) and from scratch."""
+    values = _edit(snapshot)
+    return build_snapshot(values, previous=snapshot), build_snapshot(values)
+
+
+def test_the_diff_reports_added_changed_and_removed_rows(snapshot, edited):
+    diffed, _ = edited
+    assert diffed.base_version == snapshot.version
+    spare_parts = diffed.deltas["spare_parts"]
+    assert [row["part_code"] for _, row in spare_parts.added] == ["NC-00999"]
+    assert [(old["price"], new["price"]) for _, old, new in spare_parts.updated] == [("₹3,200", "₹3,900")]
+    assert [row["code"] for _, row in diffed.deltas["error_codes"].removed] == ["ERR-123"]
+    # A moved row is neither added nor removed, and keeps its row id
+    assert not diffed.deltas["maintenance"]
+    assert sorted(diffed.row_ids["maintenance"]) == sorted(snapshot.row_ids["maintenance"])
+
+
+def test_unchanged_rows_keep_their_row_ids(snapshot, edited):
+    diffed, _ = edited
+    previous = dict(zip((row["part_code"] for row in snapshot.rows("spare_parts")), snapshot.row_ids["spare_parts"]))
+    for row_id, row in zip(diffed.row_ids["spare_parts"], diffed.rows("spare_parts")):
+        if row["part_code"] in previous:
+            assert row_id == previous[row["part_code"]]
+
+
+def test_a_diffed_snapshot_matches_a_full_rebuild(edited):
+    diffed, rebuilt = edited
+    assert diffed.version == rebuilt.version
+    for tab in MIRROR_TABS:
+        assert diffed.rows(tab) == rebuilt.rows(tab)
+        for ours, theirs in zip(diffed.records(tab), rebuilt.records(tab)):
+            assert [getattr(ours, a) for a in ours.__slots__ if a != "row_id"] == \
+                   [getattr(theirs, a) for a in theirs.__slots__ if a != "row_id"]
+
+
+@pytest.mark.parametrize("term", ["BLADE", "belt", "guard", "sensor calibration", "rollers", "lubric"])
+def test_delta_updated_text_indexes_match_a_full_rebuild(edited, term):
+    diffed, rebuilt = edited
+    for tab in ("spare_parts", "maintenance"):
+        assert sorted(map(str, diffed.rows_by_ids(tab, diffed.index(f"{tab}_text").search(term)))) == \
+               sorted(map(str, rebuilt.rows_by_ids(tab, rebuilt.index(f"{tab}_text").search(term))))
+        ours = diffed.index(f"{tab}_bm25").search(term, 10)
+        theirs = rebuilt.index(f"{tab}_bm25").search(term, 10)
+        assert diffed.rows_by_ids(tab, [i for i, _ in ours], keep_order=True) == \
+               rebuilt.rows_by_ids(tab, [i for i, _ in theirs], keep_order=True)
+        assert [score for _, score in ours] == pytest.approx([score for _, score in theirs])
+
+
+def test_position_indexes_of_changed_tabs_are_rebuilt(snapshot, edited):
+    snapshot.build_indexes()
+    diffed, rebuilt = edited
+    # maintenance rows only moved, so its due dates are carried over as is; spare parts changed
+    assert diffed._indexes["due_date"] is snapshot._indexes["due_date"]
+    assert "part_columns" not in diffed._indexes
+    assert diffed.index("part_columns").price.tolist() == rebuilt.index("part_columns").price.tolist()
+    for code in ("ERR-123", "E-352", "NC-00999"):
+        assert diffed.index("error_code").lookup(code) == rebuilt.index("error_code").lookup(code)
+        assert diffed.index("part_code").lookup(code) == rebuilt.index("part_code").lookup(code)
+
+
+def test_delta_sync_matches_a_full_sync(snapshot, edited, tmp_path):
+    diffed, rebuilt = edited
+    incremental = SqliteStore(str(tmp_path / "incremental.db"))
+    incremental.sync(snapshot)
+    incremental.sync(diffed)
+    full = SqliteStore(str(tmp_path / "full.db"))
+    full.sync(rebuilt)
+    assert incremental.row_count("spare_parts") == len(rebuilt.rows("spare_parts"))
+    for tab in MIRROR_TABS:
+        assert sorted(incremental._rows(f"SELECT data FROM {tab}"), key=str) == sorted(full._rows(f"SELECT data FROM {tab}"), key=str)
+    assert incremental.find_parts_by_code("NC-00999") == full.find_parts_by_code("NC-00999")
+    assert incremental.rank_parts_text("guard", 5) == full.rank_parts_text("guard", 5)
+    assert incremental.find_error_codes("ERR-123") == full.find_error_codes("ERR-123")
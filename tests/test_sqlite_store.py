@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from helper import data_source, sqlite_store
+from helper.snapshot import build_snapshot
+from helper.sqlite_store import SqliteStore
+
+
+def _snapshot_rows(snapshot, tab, machine):
+    return [snapshot.rows(tab)[i] for i in snapshot.index("machine").lookup(machine, tab)]
+
+
+@pytest.mark.parametrize("machine", ["bobst sp102", "BOBST-SP-102", "sp102", "bobst", "MASTERFOLD", "masterfold", "CUT"])
+def test_machine_names_resolve_like_the_snapshot(snapshot, store, machine):
+    for tab in ("error_codes", "spare_parts", "maintenance"):
+        assert store.find_by_machine(tab, machine) == _snapshot_rows(snapshot, tab, machine)
+
+
+def test_machine_filters_use_the_aliases(store):
+    assert [row["part_code"] for row, _ in store.query_parts(machine="bobst sp102")] == ["SP-201"]
+    assert [row["part_code"] for row in store.find_parts_by_availability("out_of_stock", "BOBST-SP-102")] == ["SP-201"]
+    assert [row["part_code"] for row in store.find_parts_by_price(40000, None, "sp102")] == ["SP-201"]
+    assert [row["code"] for row, _ in store.search_error_symptoms("startup failure", 5, "Bobst SP 102")] == ["SYS-001"]
+
+
+def test_aliases_follow_incremental_syncs(snapshot, store):
+    tabs = {name: [list(snapshot.headers[name])] + [[row[h] for h in snapshot.headers[name]] for row in rows]
+            for name, rows in snapshot.tabs.items()}
+    tabs["maintenance"].append(["NOVAFOLD 2", "2025-10-01", "Check rollers"])
+    store.sync(build_snapshot(tabs, previous=snapshot))
+    assert [row["tasks"] for row in store.find_by_machine("maintenance", "novafold-2")] == ["Check rollers"]
+
+
+def _snapshot_code_rows(snapshot, index, tab, code):
+    return [snapshot.rows(tab)[i] for i in snapshot.index(index).lookup(code)]
+
+
+@pytest.mark.parametrize("code", ["E-352", "e352", "E-325", "ERR-12", "ERR-132", "SYS-01"])
+def test_error_codes_resolve_like_the_snapshot(snapshot, store, code):
+    assert store.find_error_codes(code) == _snapshot_code_rows(snapshot, "error_code", "error_codes", code)
+
+
+@pytest.mark.parametrize("code", ["NC-00123", "nc00123", "NC-0123", "MF-00243", "SP-20"])
+def test_part_codes_resolve_like_the_snapshot(snapshot, store, code):
+    assert store.find_parts_by_code(code) == _snapshot_code_rows(snapshot, "part_code", "spare_parts", code)
+
+
+@pytest.mark.parametrize("machine", ["MASTRFOLD", "NOVACTU", "BOBTS"])
+def test_machine_typos_resolve_like_the_snapshot(snapshot, store, machine):
+    assert store.find_by_machine("error_codes", machine) == _snapshot_rows(snapshot, "error_codes", machine)
+    assert store.find_by_machine("error_codes", machine)
+
+
+def test_fuzzy_matchers_are_built_once_per_mirrored_version(snapshot, store):
+    store.find_error_codes("E-325")
+    matcher = store._matchers["code_key"][1]
+    store.find_error_codes("ERR-132")
+    assert store._matchers["code_key"][1] is matcher
+
+    tabs = {name: [list(snapshot.headers[name])] + [[row[h] for h in snapshot.headers[name]] for row in rows]
+            for name, rows in snapshot.tabs.items()}
+    tabs["error_codes"].append(["NOVACUT", "ERR-777", "Motor overheating", "Let it cool down"])
+    store.sync(build_snapshot(tabs, previous=snapshot))
+    assert [row["code"] for row in store.find_error_codes("ERR-778")] == ["ERR-777"]
+    assert store._matchers["code_key"][1] is not matcher
+
+
+def test_sheet_edits_reach_the_mirror_through_the_sync_thread(snapshot, tmp_path, monkeypatch):
+    source = data_source.InMemoryDataSource(snapshot.tabs)
+    monkeypatch.setattr(data_source, "_data_source", source)
+    store = SqliteStore(str(tmp_path / "mirror.db"))
+    monkeypatch.setattr(sqlite_store, "_store", store)
+    assert sqlite_store.sync_if_changed() and store.mirrored_version() == source.get_snapshot().version
+    assert sqlite_store.sync_if_changed() == {}
+
+    tabs = {name: list(rows) for name, rows in snapshot.tabs.items()}
+    tabs["spare_parts"] = tabs["spare_parts"] + [{**tabs["spare_parts"][0], "part_code": "MF-00999"}]
+    source.replace(tabs)
+    sqlite_store.start_mirror_sync(interval=0.01)
+    try:
+        deadline = time.monotonic() + 5
+        while store.mirrored_version() != source.get_snapshot().version and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sqlite_store.stop_mirror_sync()
+    assert [row["part_code"] for row in store.find_parts_by_code("MF-00999")] == ["MF-00999"]
+
+
+
+def test_code_prefixes_seek_the_key_index(tmp_path):
+    parts = [["machine", "part_code", "name", "description", "price", "availability"]] + [
+        [f"MACHINE-{i % 50}", f"P-{i:05d}", f"Part {i}", "", "₹100", "In Stock"] for i in range(5000)
+    ]
+    store = SqliteStore(str(tmp_path / "mirror.db"))
+    store.sync(build_snapshot({"error_codes": [["machine", "code"]], "spare_parts": parts, "maintenance": [["machine"]]}))
+    statements = []
+    store.connection().set_trace_callback(statements.append)
+    assert [row["part_code"] for row in store.find_parts_by_code("P-0012")] == [f"P-{i:05d}" for i in range(120, 130)]
+    store.connection().set_trace_callback(None)
+    # The exact probe misses, the prefix lookup answers
+    assert len(statements) == 2
+    plan = " ".join(row[-1] for row in store.connection().execute("EXPLAIN QUERY PLAN " + statements[-1]))
+    assert "USING INDEX idx_spare_parts_code_key (part_code_key>? AND part_code_key<?)" in plan
@@ -1,50 +1,203 @@
 import json
 import sys
 import os
+from datetime import date
+from typing import List, Optional
 from langchain.tools import tool
 from pydantic import BaseModel, Field
 
 # Add the parent directory to Python path to import helper modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-try:
-    from helper.google_sheets import query_google_sheets
-except ImportError:
-    print("Error: Cannot import query_google_sheets. Check your file structure.")
-    # Define a fallback function for testing
-    def query_google_sheets(sheet_name):
-        print(f"Fallback: query_google_sheets called with {sheet_name}")
-        return []
-
-class ErrorCodeSearchArgs(BaseModel):
+from helper.result_shaping import TOOL_TOKEN_BUDGET, ShapingArgs, grouped_rows, shape_results, shaped, staleness
+from helper.indexes import error_text
+from helper.records import normalize_key, parse_date_ordinal
+from helper.snapshot import get_snapshot
+from helper.sqlite_store import get_sqlite_store, use_sqlite_backend
+
+def _error_code_rows(error_code: str, snapshot=None) -> list:
+    """Rows for one error code, from the snapshot, or from the SQLite mirror when snapshot is None."""
+    if snapshot is None:
+        return get_sqlite_store().find_error_codes(error_code)
+    # E-352, e352 and "E 352" share one key; prefix/substring matches only when the exact lookup misses
+    records = snapshot.records("error_codes")
+    return [records[i].row for i in snapshot.index("error_code").lookup(error_code)]
+
+def _machine_rows(machine: str, snapshot=None) -> list:
+    if snapshot is None:
+        return get_sqlite_store().find_by_machine("error_codes", machine)
+    # One machine index per snapshot, shared by all tabs; cost follows the number of matches
+    records = snapshot.records("error_codes")
+    return [records[i].row for i in snapshot.index("machine").lookup(machine, "error_codes")]
+
+class ErrorCodeSearchArgs(ShapingArgs):
     error_code: str = Field(description="The error code to look up, e.g., E-352, ERR-123.")
  
 @tool(args_schema=ErrorCodeSearchArgs)
+@shaped
 def search_by_error_code(error_code: str) -> list:
     """Searches the 'error_codes' sheet for information about a specific error code."""
-    data = query_google_sheets("error_codes")
-    results = [
-        row for row in data 
-        if error_code.upper() in row.get('code', '').upper()
-    ]
+    results = _error_code_rows(error_code, None if use_sqlite_backend() else get_snapshot())
     print(f"🔍 Error code search found {len(results)} matches for code: {error_code}")
     return results
 
 # Tool 2: Search by Machine
-class MachineSearchArgs(BaseModel):
+class MachineSearchArgs(ShapingArgs):
     machine: str = Field(description="The name of the machine, e.g., MASTERFOLD, NOVACUT.")
  
 @tool(args_schema=MachineSearchArgs)
+@shaped
 def search_by_machine(machine: str) -> list:
     """Searches the 'error_codes' sheet for all error codes related to a specific machine."""
-    data = query_google_sheets("error_codes")
-    results = [
-        row for row in data 
-        if machine.upper() in row.get('machine', '').upper()
-    ]
+    results = _machine_rows(machine, None if use_sqlite_backend() else get_snapshot())
     print(f"🔍 Machine search found {len(results)} matches for machine: {machine}")
     return results
 
-error_code_tools = [search_by_error_code,search_by_machine]
+# Tool 3: Search by symptom description
+class SymptomSearchArgs(ShapingArgs):
+    symptom: str = Field(description="The problem in the technician's words, e.g., 'conveyor running out of sync'.")
+    machine: Optional[str] = Field(default=None, description="Only errors of this machine (optional), e.g., MASTERFOLD.")
+    limit: int = Field(default=5, ge=1, le=50, description="Maximum number of errors to return, most similar first (default: 5).")
+
+@tool(args_schema=SymptomSearchArgs)
+@shaped
+def search_errors_by_symptom(symptom: str, machine: Optional[str] = None, limit: int = 5) -> list:
+    """
+    Finds the error codes whose description and solution best match a described symptom, most similar first,
+    each with a similarity score. Use it when the user describes a problem instead of giving an error code.
+    """
+    if use_sqlite_backend():
+        ranked = get_sqlite_store().search_error_symptoms(symptom, limit, machine)
+    else:
+        # Hashed TF-IDF embeddings built once per snapshot; one sparse dot product per query
+        snapshot = get_snapshot()
+        positions = snapshot.index("machine").lookup(machine, "error_codes") if machine else None
+        rows = snapshot.rows("error_codes")
+        ranked = [(rows[i], score) for i, score in snapshot.index("error_symptoms").search(symptom, limit, positions)]
+    results = [{**row, "score": round(score, 3)} for row, score in ranked]
+    print(f"🔍 Symptom search found {len(results)} matches for: {symptom}")
+    return results
+
+# Batch lookups: one tool call for a whole list of codes or machines
+class ErrorCodesBatchArgs(ShapingArgs):
+    error_codes: List[str] = Field(min_length=1, max_length=50, description="All the error codes to look up, e.g., ['E-352', 'E-410'].")
+
+@tool(args_schema=ErrorCodesBatchArgs)
+@shaped
+def search_by_error_codes(error_codes: List[str]) -> tuple[list, Optional[dict]]:
+    """
+    Looks up several error codes in one call. The 'query' column tells which code each row answers;
+    codes without any match are listed in 'not_found'.
+    """
+    snapshot = None if use_sqlite_backend() else get_snapshot()
+    results, not_found = grouped_rows(error_codes, lambda code: _error_code_rows(code, snapshot))
+    print(f"🔍 Batch error code search found {len(results)} matches for {len(error_codes)} codes")
+    return results, {"not_found": not_found} if not_found else None
+
+class MachinesBatchArgs(ShapingArgs):
+    machines: List[str] = Field(min_length=1, max_length=20, description="All the machines to look up, e.g., ['MASTERFOLD', 'NOVACUT'].")
+
+@tool(args_schema=MachinesBatchArgs)
+@shaped
+def search_by_machines(machines: List[str]) -> tuple[list, Optional[dict]]:
+    """
+    Lists the error codes of several machines in one call. The 'query' column tells which machine each row
+    answers; machines without any error code are listed in 'not_found'.
+    """
+    snapshot = None if use_sqlite_backend() else get_snapshot()
+    results, not_found = grouped_rows(machines, lambda machine: _machine_rows(machine, snapshot))
+    print(f"🔍 Batch machine search found {len(results)} matches for {len(machines)} machines")
+    return results, {"not_found": not_found} if not_found else None
+
+error_code_tools = [search_by_error_code, search_by_machine, search_errors_by_symptom, search_by_error_codes, search_by_machines]
+
+# Tool 4: Error overview across all three sheets (used by the supervisor directly)
+class ErrorOverviewArgs(BaseModel):
+    error_code: str = Field(description="The error code to look up, e.g., E-410.")
+    machine: Optional[str] = Field(default=None, description="Only this machine's entry for the code (optional), e.g., MASTERFOLD.")
+    days_ahead: int = Field(default=30, ge=0, description="How many days ahead counts as upcoming maintenance (default: 30).")
+    max_parts: int = Field(default=5, ge=1, le=50, description="Maximum number of spare parts per error (default: 5).")
+    error_cursor: Optional[str] = Field(default=None, description="The error section's next_cursor from a previous call (optional).")
+    parts_cursor: Optional[str] = Field(default=None, description="The parts section's next_cursor from a previous call (optional).")
+    overdue_cursor: Optional[str] = Field(default=None, description="The overdue_maintenance section's next_cursor from a previous call (optional).")
+    upcoming_cursor: Optional[str] = Field(default=None, description="The upcoming_maintenance section's next_cursor from a previous call (optional).")
+
+def _sqlite_overview(error_code, machine, today, horizon, max_parts):
+    store = get_sqlite_store()
+    errors = store.find_error_codes(error_code)
+    if machine and errors:
+        machine_keys = set(store.resolve_machine(machine))
+        errors = [row for row in errors if normalize_key(row.get('machine', '')) in machine_keys]
+    parts, overdue, upcoming, seen = [], [], [], set()
+    for error in errors:
+        machine_key = normalize_key(error.get('machine', ''))
+        ranked = store.query_parts(text=error_text(error), limit=max_parts, machine_key=machine_key)
+        if len(ranked) < max_parts:
+            # Then the machine's other parts, in sheet order
+            ranked_codes = {row.get('part_code') for row, _ in ranked}
+            ranked += [(row, None) for row in store.find_by_machine_key("spare_parts", machine_key)
+                       if row.get('part_code') not in ranked_codes]
+        parts += [{**row, "score": None if score is None else round(score, 3), "for_code": error.get('code')}
+                  for row, score in ranked[:max_parts]]
+        if machine_key in seen:
+            continue
+        seen.add(machine_key)
+        for task in store.find_by_machine_key("maintenance", machine_key):
+            due = parse_date_ordinal(task.get('next_due'))
+            if due is not None and due < today:
+                overdue.append(task)
+            elif due is not None and due <= horizon:
+                upcoming.append(task)
+    by_due = lambda task: task.get('next_due', '')
+    return errors, parts, sorted(overdue, key=by_due), sorted(upcoming, key=by_due)
+
+def _snapshot_overview(error_code, machine, today, horizon, max_parts):
+    snapshot = get_snapshot()
+    positions = snapshot.index("error_code").lookup(error_code)
+    if machine and positions:
+        machine_keys = set(snapshot.index("machine").resolve(machine))
+        records = snapshot.records("error_codes")
+        positions = [i for i in positions if records[i].machine_key in machine_keys]
+    errors = [snapshot.records("error_codes")[i] for i in positions]
+    join = snapshot.index("error_join") if positions else None
+    part_records, task_records = snapshot.records("spare_parts"), snapshot.records("maintenance")
+    parts, overdue, upcoming, seen = [], [], [], set()
+    for position, error in zip(positions, errors):
+        parts += [{**part_records[i].row, "score": None if score is None else round(score, 3), "for_code": error.code}
+                  for i, score in join.parts(position)[:max_parts]]
+        if error.machine_key in seen:
+            continue
+        seen.add(error.machine_key)
+        overdue += [task_records[i].row for i in join.tasks(position, None, today - 1)]
+        upcoming += [task_records[i].row for i in join.tasks(position, today, horizon)]
+    by_due = lambda task: task.get('next_due', '')
+    return [error.row for error in errors], parts, sorted(overdue, key=by_due), sorted(upcoming, key=by_due)
+
+@tool(args_schema=ErrorOverviewArgs)
+def get_error_overview(error_code: str, machine: Optional[str] = None, days_ahead: int = 30, max_parts: int = 5,
+                       error_cursor: Optional[str] = None, parts_cursor: Optional[str] = None,
+                       overdue_cursor: Optional[str] = None, upcoming_cursor: Optional[str] = None) -> dict:
+    """
+    One-call overview of an error code: its diagnosis and solution, the spare parts of the same machine
+    (parts related to the error first) and the machine's overdue and upcoming maintenance.
+    Use it when a question combines an error with parts and/or maintenance.
+    A section with more rows has a next_cursor: call again with the same arguments and that section's cursor.
+    """
+    today = date.today().toordinal()
+    overview = _sqlite_overview if use_sqlite_backend() else _snapshot_overview
+    errors, parts, overdue, upcoming = overview(error_code, machine, today, today + days_ahead, max_parts)
+    print(f"🔗 Error overview for {error_code}: {len(errors)} errors, {len(parts)} parts, "
+          f"{len(overdue)} overdue and {len(upcoming)} upcoming tasks")
+    # The four sections share one tool message budget, each paged by its own cursor
+    budget = TOOL_TOKEN_BUDGET // 4
+    return {
+        "error": shape_results(errors, cursor=error_cursor, token_budget=budget, cursor_arg="error_cursor"),
+        "parts": shape_results(parts, cursor=parts_cursor, token_budget=budget, cursor_arg="parts_cursor"),
+        "overdue_maintenance": shape_results(overdue, cursor=overdue_cursor, token_budget=budget,
+                                             cursor_arg="overdue_cursor"),
+        "upcoming_maintenance": shape_results(upcoming, cursor=upcoming_cursor, token_budget=budget,
+                                              cursor_arg="upcoming_cursor"),
+        **staleness(),
+    }
 
 # if __name__ == '__main__':
 #     print("--- Testing Error Code Search Tools ---")
@@ -2,70 +2,72 @@ from datetime import date, datetime
 import json
 import sys
 import os
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from langchain.tools import tool
-from pydantic import BaseModel, Field
+from pydantic import Field
 
 # Add the parent directory to Python path to import helper modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from helper.google_sheets import query_google_sheets
+from helper.indexes import rank_text
+from helper.result_shaping import ShapingArgs, grouped_rows, shaped
+from helper.snapshot import get_snapshot
+from helper.sqlite_store import get_sqlite_store, use_sqlite_backend
 
-class MachineMaintenanceArgs(BaseModel):
+def _machine_task_rows(machine: str, snapshot=None) -> list:
+    """Maintenance tasks of one machine, from the snapshot, or from the SQLite mirror when snapshot is None."""
+    if snapshot is None:
+        return get_sqlite_store().find_by_machine("maintenance", machine)
+    # One machine index per snapshot, shared by all tabs; cost follows the number of matches
+    records = snapshot.records("maintenance")
+    return [records[i].row for i in snapshot.index("machine").lookup(machine, "maintenance")]
+
+class MachineMaintenanceArgs(ShapingArgs):
     machine: str = Field(description="The name of the machine to get maintenance info for, e.g., MASTERFOLD, NOVACUT.")
 
 @tool(args_schema=MachineMaintenanceArgs)
+@shaped
 def get_maintenance_by_machine(machine: str) -> list:
     """Gets all scheduled maintenance tasks for a specific machine."""
-    data = query_google_sheets("maintenance")
-    results = [
-        row for row in data
-        if machine.upper() in row.get('machine', '').upper()
-    ]
+    results = _machine_task_rows(machine, None if use_sqlite_backend() else get_snapshot())
     print(f"🔍 Found {len(results)} maintenance tasks for machine: {machine}")
     return results
 
 # Tool 2: Get maintenance tasks due within a date range
-class DateRangeMaintenanceArgs(BaseModel):
+class DateRangeMaintenanceArgs(ShapingArgs):
     start_date: str = Field(description="Start date in YYYY-MM-DD format, e.g., 2025-08-01")
     end_date: str = Field(description="End date in YYYY-MM-DD format, e.g., 2025-08-31")
 
 @tool(args_schema=DateRangeMaintenanceArgs)
+@shaped
 def get_maintenance_by_date_range(start_date: str, end_date: str) -> list:
-    """Gets all maintenance tasks scheduled within a specific date range."""
-    data = query_google_sheets("maintenance")
-    results = []
-    
+    """Gets all maintenance tasks scheduled within a specific date range, earliest first."""
     try:
         start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-        
-        for row in data:
-            next_due = row.get('next_due', '')
-            if next_due:
-                try:
-                    due_date = datetime.strptime(next_due, "%Y-%m-%d").date()
-                    if start_dt <= due_date <= end_dt:
-                        results.append(row)
-                except ValueError:
-                    continue  # Skip rows with invalid date format
-                    
     except ValueError as e:
         print(f"❌ Invalid date format: {e}")
         return []
     
+    if use_sqlite_backend():
+        results = get_sqlite_store().maintenance_due_between(start_dt.isoformat(), end_dt.isoformat())
+    else:
+        # Bisect slice of the snapshot's sorted due dates (rows with invalid dates are not indexed)
+        snapshot = get_snapshot()
+        records = snapshot.records("maintenance")
+        due_dates = snapshot.index("due_date")
+        results = [records[i].row for i in due_dates.between(start_dt.toordinal(), end_dt.toordinal())]
+    
     print(f"🔍 Found {len(results)} maintenance tasks between {start_date} and {end_date}")
     return results
 
 # Tool 3: Get overdue maintenance tasks
-class OverdueMaintenanceArgs(BaseModel):
+class OverdueMaintenanceArgs(ShapingArgs):
     reference_date: Optional[str] = Field(default=None, description="Reference date in YYYY-MM-DD format (defaults to today)")
 
 @tool(args_schema=OverdueMaintenanceArgs)
+@shaped
 def get_overdue_maintenance(reference_date: Optional[str] = None) -> list:
-    """Gets all maintenance tasks that are overdue as of the reference date (defaults to today)."""
-    data = query_google_sheets("maintenance")
-    results = []
-    
+    """Gets all maintenance tasks that are overdue as of the reference date (defaults to today), oldest first."""
     if reference_date:
         try:
             ref_dt = datetime.strptime(reference_date, "%Y-%m-%d").date()
@@ -75,96 +77,96 @@ def get_overdue_maintenance(reference_date: Optional[str] = None) -> list:
     else:
         ref_dt = date.today()
     
-    for row in data:
-        next_due = row.get('next_due', '')
-        if next_due:
-            try:
-                due_date = datetime.strptime(next_due, "%Y-%m-%d").date()
-                if due_date < ref_dt:
-                    results.append(row)
-            except ValueError:
-                continue  # Skip rows with invalid date format
+    if use_sqlite_backend():
+        day_before = date.fromordinal(ref_dt.toordinal() - 1)
+        results = get_sqlite_store().maintenance_due_between(None, day_before.isoformat())
+    else:
+        snapshot = get_snapshot()
+        records = snapshot.records("maintenance")
+        results = [records[i].row for i in snapshot.index("due_date").between(None, ref_dt.toordinal() - 1)]
     
     print(f"🔍 Found {len(results)} overdue maintenance tasks as of {ref_dt}")
     return results
 
 # Tool 4: Get upcoming maintenance tasks (next N days)
-class UpcomingMaintenanceArgs(BaseModel):
+class UpcomingMaintenanceArgs(ShapingArgs):
     days_ahead: int = Field(default=7, description="Number of days to look ahead for upcoming maintenance (default: 7)")
 
 @tool(args_schema=UpcomingMaintenanceArgs)
+@shaped
 def get_upcoming_maintenance(days_ahead: int = 7) -> list:
-    """Gets maintenance tasks due within the next N days."""
-    data = query_google_sheets("maintenance")
-    results = []
-    
+    """Gets maintenance tasks due within the next N days, soonest first."""
     today = date.today()
     future_date = date.fromordinal(today.toordinal() + days_ahead)
     
-    for row in data:
-        next_due = row.get('next_due', '')
-        if next_due:
-            try:
-                due_date = datetime.strptime(next_due, "%Y-%m-%d").date()
-                if today <= due_date <= future_date:
-                    results.append(row)
-            except ValueError:
-                continue  # Skip rows with invalid date format
+    if use_sqlite_backend():
+        results = get_sqlite_store().maintenance_due_between(today.isoformat(), future_date.isoformat())
+    else:
+        snapshot = get_snapshot()
+        records = snapshot.records("maintenance")
+        results = [records[i].row for i in snapshot.index("due_date").between(today.toordinal(), future_date.toordinal())]
     
     print(f"🔍 Found {len(results)} maintenance tasks due in the next {days_ahead} days")
     return results
 
 # Tool 5: Search maintenance tasks by keywords
-class MaintenanceTaskSearchArgs(BaseModel):
+class MaintenanceTaskSearchArgs(ShapingArgs):
     search_term: str = Field(description="Keywords to search in maintenance tasks, e.g., 'lubrication', 'belt', 'cleaning'")
+    limit: int = Field(default=10, ge=1, le=100, description="Maximum number of tasks to return, most relevant first (default: 10)")
 
 @tool(args_schema=MaintenanceTaskSearchArgs)
-def search_maintenance_by_task(search_term: str) -> list:
-    """Searches maintenance tasks by keywords in the task description."""
-    data = query_google_sheets("maintenance")
-    results = []
-    
-    for row in data:
-        tasks = row.get('tasks', '').upper()
-        if search_term.upper() in tasks:
-            results.append(row)
+@shaped
+def search_maintenance_by_task(search_term: str, limit: int = 10) -> list:
+    """Searches maintenance tasks by keywords in the task description, most relevant first, each with a relevance score."""
+    if use_sqlite_backend():
+        ranked = get_sqlite_store().rank_maintenance_tasks(search_term, limit)
+    else:
+        # BM25 over the snapshot's task texts; only rows containing a query term are scored
+        ranked = rank_text(get_snapshot(), "maintenance", search_term, limit)
+    results = [{**row, "score": None if score is None else round(score, 3)} for row, score in ranked]
     
-    print(f"🔍 Found {len(results)} maintenance tasks containing: {search_term}")
+    print(f"🔍 Found {len(results)} maintenance tasks matching: {search_term}")
     return results
 
 # Tool 6: Get all maintenance tasks (sorted by due date)
-class AllMaintenanceArgs(BaseModel):
+class AllMaintenanceArgs(ShapingArgs):
     sort_order: Literal["asc", "desc"] = Field(default="asc", description="Sort order by due date: 'asc' for earliest first, 'desc' for latest first")
 
 @tool(args_schema=AllMaintenanceArgs)
+@shaped
 def get_all_maintenance_sorted(sort_order: str = "asc") -> list:
     """Gets all maintenance tasks sorted by due date."""
-    data = query_google_sheets("maintenance")
-    
-    # Filter out rows with invalid dates and sort
-    valid_data = []
-    for row in data:
-        next_due = row.get('next_due', '')
-        if next_due:
-            try:
-                due_date = datetime.strptime(next_due, "%Y-%m-%d").date()
-                row['_sort_date'] = due_date  # Add for sorting
-                valid_data.append(row)
-            except ValueError:
-                continue  # Skip rows with invalid date format
-    
-    # Sort by date
     reverse_order = sort_order == "desc"
-    sorted_data = sorted(valid_data, key=lambda x: x['_sort_date'], reverse=reverse_order)
-    
-    # Remove the temporary sort field
-    for row in sorted_data:
-        row.pop('_sort_date', None)
+    if use_sqlite_backend():
+        sorted_data = get_sqlite_store().maintenance_sorted(descending=reverse_order)
+        print(f"🔍 Retrieved {len(sorted_data)} maintenance tasks sorted by due date ({sort_order})")
+        return sorted_data
+
+    # The snapshot keeps the due-date order (rows with invalid dates left out), so nothing is sorted per call
+    snapshot = get_snapshot()
+    records = snapshot.records("maintenance")
+    sorted_data = [records[i].row for i in snapshot.index("due_date").sorted_positions(descending=reverse_order)]
     
     print(f"🔍 Retrieved {len(sorted_data)} maintenance tasks sorted by due date ({sort_order})")
     return sorted_data
 
-maintenance_tools = [get_maintenance_by_machine, get_maintenance_by_date_range, get_overdue_maintenance, get_upcoming_maintenance, search_maintenance_by_task, get_all_maintenance_sorted]
+# Tool 7: Batch lookup for a whole list of machines
+class MachinesMaintenanceBatchArgs(ShapingArgs):
+    machines: List[str] = Field(min_length=1, max_length=20, description="All the machines to get maintenance info for, e.g., ['MASTERFOLD', 'NOVACUT'].")
+
+@tool(args_schema=MachinesMaintenanceBatchArgs)
+@shaped
+def get_maintenance_by_machines(machines: List[str]) -> tuple[list, Optional[dict]]:
+    """
+    Gets the scheduled maintenance tasks of several machines in one call. The 'query' column tells which
+    machine each row answers; machines without any task are listed in 'not_found'.
+    """
+    snapshot = None if use_sqlite_backend() else get_snapshot()
+    results, not_found = grouped_rows(machines, lambda machine: _machine_task_rows(machine, snapshot))
+    print(f"🔍 Found {len(results)} maintenance tasks for {len(machines)} machines")
+    return results, {"not_found": not_found} if not_found else None
+
+maintenance_tools = [get_maintenance_by_machine, get_maintenance_by_date_range, get_overdue_maintenance, get_upcoming_maintenance, search_maintenance_by_task, get_all_maintenance_sorted, get_maintenance_by_machines]
     
 # if __name__ == '__main__':
 #     print("--- Testing Maintenance Search Tools ---")
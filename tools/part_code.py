@@ -1,110 +1,198 @@
 import json
 import sys
 import os
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from langchain.tools import tool
-from pydantic import BaseModel, Field
+from pydantic import Field
 
 # Add the parent directory to Python path to import helper modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from helper.google_sheets import query_google_sheets
+from helper.indexes import query_parts as query_snapshot_parts, rank_text
+from helper.records import Availability
+from helper.result_shaping import ShapingArgs, grouped_rows, shaped
+from helper.snapshot import get_snapshot
+from helper.sqlite_store import get_sqlite_store, use_sqlite_backend
 
-class MachinePartSearchArgs(BaseModel):
+def _machine_part_rows(machine: str, snapshot=None) -> list:
+    """Parts of one machine, from the snapshot, or from the SQLite mirror when snapshot is None."""
+    if snapshot is None:
+        return get_sqlite_store().find_by_machine("spare_parts", machine)
+    # One machine index per snapshot, shared by all tabs; cost follows the number of matches
+    records = snapshot.records("spare_parts")
+    return [records[i].row for i in snapshot.index("machine").lookup(machine, "spare_parts")]
+
+def _part_code_rows(part_code: str, snapshot=None) -> list:
+    if snapshot is None:
+        return get_sqlite_store().find_parts_by_code(part_code)
+    # Normalized code index: exact, prefix, substring, then nearest codes for typos such as NC-0123
+    records = snapshot.records("spare_parts")
+    return [records[i].row for i in snapshot.index("part_code").lookup(part_code)]
+
+class MachinePartSearchArgs(ShapingArgs):
     machine: str = Field(description="The name of the machine, e.g., MASTERFOLD, NOVACUT, EXPERTFOLD.")
 
 @tool(args_schema=MachinePartSearchArgs)
+@shaped
 def search_parts_by_machine(machine: str) -> list:
     """Searches the 'spare_parts' sheet for all parts available for a specific machine."""
-    data = query_google_sheets("spare_parts")
-    results = [
-        row for row in data 
-        if machine.upper() in row.get('machine', '').upper()
-    ]
+    results = _machine_part_rows(machine, None if use_sqlite_backend() else get_snapshot())
     print(f"🔍 Found {len(results)} parts for machine: {machine}")
     return results
 
 # Tool 2: Search parts by part code
-class PartCodeSearchArgs(BaseModel):
+class PartCodeSearchArgs(ShapingArgs):
     part_code: str = Field(description="The part code to search for, e.g., NC-00123, MF-00789.")
 
 @tool(args_schema=PartCodeSearchArgs)
+@shaped
 def search_parts_by_code(part_code: str) -> list:
     """Searches the 'spare_parts' sheet for a specific part using its part code."""
-    data = query_google_sheets("spare_parts")
-    results = [
-        row for row in data 
-        if part_code.upper() in row.get('part_code', '').upper()
-    ]
+    results = _part_code_rows(part_code, None if use_sqlite_backend() else get_snapshot())
     print(f"🔍 Found {len(results)} parts matching code: {part_code}")
     return results
 
 # Tool 3: Search parts by name/keywords
-class PartNameSearchArgs(BaseModel):
+class PartNameSearchArgs(ShapingArgs):
     search_term: str = Field(description="Name or keyword to search in part names and descriptions, e.g., 'blade', 'motor', 'sensor'.")
+    limit: int = Field(default=10, ge=1, le=100, description="Maximum number of parts to return, most relevant first (default: 10).")
 
 @tool(args_schema=PartNameSearchArgs)
-def search_parts_by_name(search_term: str) -> list:
-    """Searches the 'spare_parts' sheet for parts by name or keywords in the description."""
-    data = query_google_sheets("spare_parts")
-    results = []
-    for row in data:
-        search_text = f"{row.get('name', '')} {row.get('description', '')}".upper()
-        if search_term.upper() in search_text:
-            results.append(row)
+@shaped
+def search_parts_by_name(search_term: str, limit: int = 10) -> list:
+    """Searches the 'spare_parts' sheet for parts by name or keywords in the description, most relevant first, each with a relevance score."""
+    if use_sqlite_backend():
+        ranked = get_sqlite_store().rank_parts_text(search_term, limit)
+    else:
+        # BM25 over the snapshot's part texts; only rows containing a query term are scored
+        ranked = rank_text(get_snapshot(), "spare_parts", search_term, limit)
+    results = [{**row, "score": None if score is None else round(score, 3)} for row, score in ranked]
     
     print(f"🔍 Found {len(results)} parts matching search term: {search_term}")
     return results
 
 # Tool 4: Search parts by availability
-class AvailabilitySearchArgs(BaseModel):
+class AvailabilitySearchArgs(ShapingArgs):
     availability_status: Literal["in_stock", "available", "out_of_stock"] = Field(
         description="Filter by availability: 'in_stock' for immediately available parts, 'available' for parts with delivery time, 'out_of_stock' for unavailable parts."
     )
+    machine: Optional[str] = Field(default=None, description="Only parts for this machine (optional), e.g., NOVACUT.")
 
 @tool(args_schema=AvailabilitySearchArgs)
-def search_parts_by_availability(availability_status: str) -> list:
-    """Searches the 'spare_parts' sheet for parts based on their availability status."""
-    data = query_google_sheets("spare_parts")
-    results = []
-    
-    for row in data:
-        availability = row.get('availability', '').lower()
-        
-        if availability_status == "in_stock" and "in stock" in availability:
-            results.append(row)
-        elif availability_status == "available" and ("day" in availability or "week" in availability):
-            results.append(row)
-        elif availability_status == "out_of_stock" and ("out of stock" in availability or "unavailable" in availability):
-            results.append(row)
+@shaped
+def search_parts_by_availability(availability_status: str, machine: Optional[str] = None) -> list:
+    """Searches the 'spare_parts' sheet for parts based on their availability status, optionally for one machine."""
+    if use_sqlite_backend():
+        results = get_sqlite_store().find_parts_by_availability(availability_status, machine)
+    else:
+        # Availability is an int8 column parsed once per snapshot; filters combine as one vectorized mask
+        snapshot = get_snapshot()
+        records = snapshot.records("spare_parts")
+        machine_keys = snapshot.index("machine").resolve(machine) if machine else None
+        positions = snapshot.index("part_columns").filter(
+            machine_keys=machine_keys, availability=Availability.from_status(availability_status)
+        )
+        results = [records[i].row for i in positions]
     
     print(f"🔍 Found {len(results)} parts with availability status: {availability_status}")
     return results
 
 # Tool 5: Search parts by price range
-class PriceRangeSearchArgs(BaseModel):
+class PriceRangeSearchArgs(ShapingArgs):
     min_price: Optional[float] = Field(default=None, description="Minimum price in rupees (optional).")
     max_price: Optional[float] = Field(default=None, description="Maximum price in rupees (optional).")
+    machine: Optional[str] = Field(default=None, description="Only parts for this machine (optional), e.g., NOVACUT.")
 
 @tool(args_schema=PriceRangeSearchArgs)
-def search_parts_by_price_range(min_price: Optional[float] = None, max_price: Optional[float] = None) -> list:
-    """Searches the 'spare_parts' sheet for parts within a specified price range."""
-    data = query_google_sheets("spare_parts")
-    results = []
-    
-    for row in data:
-        price_str = row.get('price', '').replace('₹', '').replace(',', '')
-        try:
-            price = float(price_str)
-            if (min_price is None or price >= min_price) and (max_price is None or price <= max_price):
-                results.append(row)
-        except (ValueError, TypeError):
-            continue  # Skip rows with invalid price data
+@shaped
+def search_parts_by_price_range(min_price: Optional[float] = None, max_price: Optional[float] = None,
+                                machine: Optional[str] = None) -> list:
+    """Searches the 'spare_parts' sheet for parts within a specified price range, optionally for one machine."""
+    if use_sqlite_backend():
+        results = get_sqlite_store().find_parts_by_price(min_price, max_price, machine)
+    else:
+        # Prices are a float64 column (NaN for invalid prices, which never match)
+        snapshot = get_snapshot()
+        records = snapshot.records("spare_parts")
+        machine_keys = snapshot.index("machine").resolve(machine) if machine else None
+        positions = snapshot.index("part_columns").filter(
+            machine_keys=machine_keys, min_price=min_price, max_price=max_price, priced=True
+        )
+        results = [records[i].row for i in positions]
     
     price_range = f"₹{min_price or 0:,.0f} - ₹{max_price or float('inf'):,.0f}"
     print(f"🔍 Found {len(results)} parts in price range: {price_range}")
     return results
 
-part_code_tools = [search_parts_by_machine, search_parts_by_code, search_parts_by_name, search_parts_by_availability, search_parts_by_price_range]
+# Tool 6: Compound parts query
+class PartQueryArgs(ShapingArgs):
+    machine: Optional[str] = Field(default=None, description="Only parts for this machine (optional), e.g., NOVACUT.")
+    text: Optional[str] = Field(default=None, description="Keywords in part names and descriptions (optional), e.g., 'blade'.")
+    availability_status: Optional[Literal["in_stock", "available", "out_of_stock"]] = Field(
+        default=None, description="Only parts with this availability (optional): 'in_stock', 'available' or 'out_of_stock'."
+    )
+    min_price: Optional[float] = Field(default=None, description="Minimum price in rupees (optional).")
+    max_price: Optional[float] = Field(default=None, description="Maximum price in rupees (optional).")
+    sort_by: Literal["relevance", "price_asc", "price_desc"] = Field(
+        default="relevance", description="'relevance' (best text match first, else sheet order), 'price_asc' or 'price_desc'."
+    )
+    limit: int = Field(default=20, ge=1, le=100, description="Maximum number of parts to return (default: 20).")
+
+@tool(args_schema=PartQueryArgs)
+@shaped
+def query_parts(machine: Optional[str] = None, text: Optional[str] = None, availability_status: Optional[str] = None,
+                min_price: Optional[float] = None, max_price: Optional[float] = None, sort_by: str = "relevance",
+                limit: int = 20) -> list:
+    """
+    Finds spare parts matching all the given filters at once: machine, keywords, availability and price range,
+    sorted and limited. Use it for combined questions such as "in-stock NOVACUT blades under ₹20,000".
+    Results matched by keywords carry a relevance score.
+    """
+    if use_sqlite_backend():
+        ranked = get_sqlite_store().query_parts(machine, text, availability_status, min_price, max_price, sort_by, limit)
+    else:
+        # Machine, availability and price are one vectorized mask, intersected with the BM25 matches of text
+        availability = Availability.from_status(availability_status) if availability_status else None
+        ranked = query_snapshot_parts(get_snapshot(), machine, text, availability, min_price, max_price, sort_by, limit)
+    results = [row if text is None else {**row, "score": None if score is None else round(score, 3)}
+               for row, score in ranked]
+
+    filters = {"machine": machine, "text": text, "availability": availability_status,
+               "min_price": min_price, "max_price": max_price}
+    print(f"🔍 Found {len(results)} parts for {', '.join(f'{k}={v}' for k, v in filters.items() if v is not None) or 'all parts'}")
+    return results
+
+# Batch lookups: one tool call for a whole list of part codes or machines
+class PartCodesBatchArgs(ShapingArgs):
+    part_codes: List[str] = Field(min_length=1, max_length=50, description="All the part codes to look up, e.g., ['NC-00123', 'MF-00789'].")
+
+@tool(args_schema=PartCodesBatchArgs)
+@shaped
+def search_parts_by_codes(part_codes: List[str]) -> tuple[list, Optional[dict]]:
+    """
+    Looks up several part codes in one call. The 'query' column tells which code each row answers;
+    codes without any match are listed in 'not_found'.
+    """
+    snapshot = None if use_sqlite_backend() else get_snapshot()
+    results, not_found = grouped_rows(part_codes, lambda code: _part_code_rows(code, snapshot))
+    print(f"🔍 Batch part code search found {len(results)} parts for {len(part_codes)} codes")
+    return results, {"not_found": not_found} if not_found else None
+
+class MachinesPartBatchArgs(ShapingArgs):
+    machines: List[str] = Field(min_length=1, max_length=20, description="All the machines to list parts for, e.g., ['MASTERFOLD', 'NOVACUT'].")
+
+@tool(args_schema=MachinesPartBatchArgs)
+@shaped
+def search_parts_by_machines(machines: List[str]) -> tuple[list, Optional[dict]]:
+    """
+    Lists the spare parts of several machines in one call. The 'query' column tells which machine each row
+    answers; machines without any part are listed in 'not_found'.
+    """
+    snapshot = None if use_sqlite_backend() else get_snapshot()
+    results, not_found = grouped_rows(machines, lambda machine: _machine_part_rows(machine, snapshot))
+    print(f"🔍 Batch machine search found {len(results)} parts for {len(machines)} machines")
+    return results, {"not_found": not_found} if not_found else None
+
+part_code_tools = [search_parts_by_machine, search_parts_by_code, search_parts_by_name, search_parts_by_availability, search_parts_by_price_range, query_parts, search_parts_by_codes, search_parts_by_machines]
 
 # if __name__ == '__main__':
 #     print("--- Testing Spare Parts Search Tools ---")